@@ -10,7 +10,7 @@ import sys
 
 sys.path.append(os.path.join(sys.path[0], 'src'))
 
-from src.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from src.config import settings
 from src.users.models import *
 from src.tiktok.orders.models import *
 from src.tiktok.returns.models import *
@@ -28,11 +28,11 @@ from src.notifications.models import *
 config = context.config
 
 section = config.config_ini_section
-config.set_section_option(section, "DB_HOST", DB_HOST)
-config.set_section_option(section, "DB_NAME", DB_NAME)
-config.set_section_option(section, "DB_PASS", DB_PASS)
-config.set_section_option(section, "DB_PORT", DB_PORT)
-config.set_section_option(section, "DB_USER", DB_USER)
+config.set_section_option(section, "DB_HOST", settings.db_host)
+config.set_section_option(section, "DB_NAME", settings.db_name)
+config.set_section_option(section, "DB_PASS", settings.db_pass)
+config.set_section_option(section, "DB_PORT", settings.db_port)
+config.set_section_option(section, "DB_USER", settings.db_user)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -0,0 +1,33 @@
+"""users email covering index
+
+Revision ID: eb3a26991428
+Revises: 45de876a5b21
+Create Date: 2026-01-10 14:12:37.519204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb3a26991428'
+down_revision: Union[str, Sequence[str], None] = '45de876a5b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index(
+        'ix_users_email', 'users', ['email'], unique=True,
+        postgresql_include=['id', 'hashed_password', 'is_active', 'role'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
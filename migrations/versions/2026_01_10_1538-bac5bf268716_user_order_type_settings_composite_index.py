@@ -0,0 +1,38 @@
+"""user_order_type_settings composite index
+
+Revision ID: bac5bf268716
+Revises: eb3a26991428
+Create Date: 2026-01-10 15:38:04.916352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bac5bf268716'
+down_revision: Union[str, Sequence[str], None] = 'eb3a26991428'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубликаты пары (user_id, order_type_id) не дадут создать уникальный индекс
+    op.execute("""
+        DELETE FROM user_order_type_settings a
+        USING user_order_type_settings b
+        WHERE a.user_id = b.user_id
+          AND a.order_type_id = b.order_type_id
+          AND a.id > b.id
+    """)
+    op.create_index('ix_user_order_type_settings_user_id_order_type_id', 'user_order_type_settings', ['user_id', 'order_type_id'], unique=True)
+    op.drop_index(op.f('ix_user_order_type_settings_user_id'), table_name='user_order_type_settings')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_user_order_type_settings_user_id'), 'user_order_type_settings', ['user_id'], unique=False)
+    op.drop_index('ix_user_order_type_settings_user_id_order_type_id', table_name='user_order_type_settings')
@@ -0,0 +1,39 @@
+"""notifications type smallint
+
+Revision ID: d4b8e61f2c53
+Revises: a27c5e9b3d10
+Create Date: 2026-01-15 09:47:26.530194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e61f2c53'
+down_revision: Union[str, Sequence[str], None] = 'a27c5e9b3d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL ENUM -> smallint, значения совпадают с NotificationType
+    op.execute(
+        "ALTER TABLE notifications ALTER COLUMN type TYPE smallint USING CASE type "
+        "WHEN 'INFO' THEN 0 WHEN 'WARNING' THEN 1 WHEN 'SUCCESS' THEN 2 WHEN 'ERROR' THEN 3 END"
+    )
+    op.execute("DROP TYPE notificationtype")
+    op.create_check_constraint('ck_notifications_type', 'notifications', 'type BETWEEN 0 AND 3')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ck_notifications_type', 'notifications', type_='check')
+    op.execute("CREATE TYPE notificationtype AS ENUM ('INFO', 'WARNING', 'SUCCESS', 'ERROR')")
+    op.execute(
+        "ALTER TABLE notifications ALTER COLUMN type TYPE notificationtype USING (CASE type "
+        "WHEN 0 THEN 'INFO' WHEN 1 THEN 'WARNING' WHEN 2 THEN 'SUCCESS' WHEN 3 THEN 'ERROR' END)::notificationtype"
+    )
@@ -1,14 +1,116 @@
+import json
+from dataclasses import dataclass
+from datetime import time
+from decimal import Decimal
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer
 from fastapi.security.utils import get_authorization_scheme_param
-from jose import JWTError
+from jwt import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.tokens import decode_token
+from src.cache import redis_client
 from src.database import get_async_session
-from src.users.models import User
+from src.users.models import User, UserRole
 from sqlalchemy.future import select
 
+USER_CACHE_TTL = 30  # секунд
+
+ADMIN_ROLES = frozenset({"admin"})
+MANAGER_ROLES = frozenset({"admin", "manager"})
+CASHIER_ROLES = frozenset({"admin", "manager", "cashier"})
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Снимок пользователя для авторизации: поля, которые читают роутеры и шаблоны"""
+    id: int
+    email: str
+    name: str
+    role: UserRole
+    default_rate: Optional[Decimal]
+    default_percent: Optional[Decimal]
+    shift_start: Optional[time]
+    shift_end: Optional[time]
+    can_take_vacation: bool
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            role=UserRole(user.role),
+            default_rate=user.default_rate,
+            default_percent=user.default_percent,
+            shift_start=user.shift_start,
+            shift_end=user.shift_end,
+            can_take_vacation=bool(user.can_take_vacation),
+            is_active=bool(user.is_active),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id,
+            "email": self.email,
+            "name": self.name,
+            "role": self.role.value,
+            "default_rate": _str_or_none(self.default_rate),
+            "default_percent": _str_or_none(self.default_percent),
+            "shift_start": self.shift_start.isoformat() if self.shift_start else None,
+            "shift_end": self.shift_end.isoformat() if self.shift_end else None,
+            "can_take_vacation": self.can_take_vacation,
+            "is_active": self.is_active,
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CurrentUser":
+        data = json.loads(raw)
+        return cls(
+            id=data["id"],
+            email=data["email"],
+            name=data["name"],
+            role=UserRole(data["role"]),
+            default_rate=_decimal_or_none(data["default_rate"]),
+            default_percent=_decimal_or_none(data["default_percent"]),
+            shift_start=time.fromisoformat(data["shift_start"]) if data["shift_start"] else None,
+            shift_end=time.fromisoformat(data["shift_end"]) if data["shift_end"] else None,
+            can_take_vacation=data["can_take_vacation"],
+            is_active=data["is_active"],
+        )
+
+
+def _str_or_none(value) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _decimal_or_none(value) -> Optional[Decimal]:
+    return Decimal(value) if value is not None else None
+
+
+def user_cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+async def load_user_cached(user_id: int, session: AsyncSession) -> Optional[CurrentUser]:
+    raw = await redis_client.get(user_cache_key(user_id))
+    if raw is not None:
+        return CurrentUser.from_json(raw)
+
+    user = await session.get(User, user_id)
+    if not user:
+        return None
+    snapshot = CurrentUser.from_user(user)
+    await redis_client.setex(user_cache_key(user_id), USER_CACHE_TTL, snapshot.to_json())
+    return snapshot
+
+
+async def invalidate_user_cache(user_id: int):
+    await redis_client.delete(user_cache_key(user_id))
+
 
 class OAuth2PasswordBearerWithCookie(HTTPBearer):
     async def __call__(self, request: Request) -> str:
@@ -21,33 +123,55 @@ class OAuth2PasswordBearerWithCookie(HTTPBearer):
 
 oauth2_scheme = OAuth2PasswordBearerWithCookie()
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)
-):
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> dict:
     try:
         payload = decode_token(token)
-        user_id = int(payload.get("sub"))
-    except (JWTError, ValueError):
+        int(payload.get("sub"))
+    except (InvalidTokenError, ValueError, TypeError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload
 
-    user = await session.get(User, user_id)
+
+async def _load_active_user(claims: dict, session: AsyncSession) -> CurrentUser:
+    user = await load_user_cached(int(claims["sub"]), session)
     if not user or not user.is_active:
         raise HTTPException(status_code=403, detail="Inactive user")
     return user
 
 
-async def get_admin_user(current_user: User = Depends(get_current_user)):
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Admin only")
-    return current_user
+async def _load_user_with_role(
+    claims: dict, session: AsyncSession, allowed_roles: frozenset, detail: str
+) -> CurrentUser:
+    # Роль из токена позволяет отказать сразу, без обращения к кэшу и БД
+    role = claims.get("role")
+    if role is not None and role not in allowed_roles:
+        raise HTTPException(status_code=403, detail=detail)
 
+    # Повторная проверка по актуальной роли: старые токены без role и понижение прав
+    user = await _load_active_user(claims, session)
+    if user.role not in allowed_roles:
+        raise HTTPException(status_code=403, detail=detail)
+    return user
 
-async def get_manager_or_admin(current_user: User = Depends(get_current_user)):
-    if current_user.role not in ["admin", "manager"]:
-        raise HTTPException(status_code=403, detail="Managers or admins only")
-    return current_user
 
-async def get_cashier_or_manager_or_admin(current_user: User = Depends(get_current_user)):
-    if current_user.role not in ["admin", "manager", "cashier"]:
-        raise HTTPException(status_code=403, detail="Cashiers, managers or admins only")
-    return current_user
+async def get_current_user(
+    claims: dict = Depends(get_current_claims), session: AsyncSession = Depends(get_async_session)
+):
+    return await _load_active_user(claims, session)
+
+
+async def get_admin_user(
+    claims: dict = Depends(get_current_claims), session: AsyncSession = Depends(get_async_session)
+):
+    return await _load_user_with_role(claims, session, ADMIN_ROLES, "Admin only")
+
+
+async def get_manager_or_admin(
+    claims: dict = Depends(get_current_claims), session: AsyncSession = Depends(get_async_session)
+):
+    return await _load_user_with_role(claims, session, MANAGER_ROLES, "Managers or admins only")
+
+async def get_cashier_or_manager_or_admin(
+    claims: dict = Depends(get_current_claims), session: AsyncSession = Depends(get_async_session)
+):
+    return await _load_user_with_role(claims, session, CASHIER_ROLES, "Cashiers, managers or admins only")
@@ -0,0 +1,12 @@
+from passlib.context import CryptContext
+
+# argon2id для новых хешей; bcrypt остаётся для проверки старых
+# и перехешируется при следующем входе (deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
@@ -1,26 +1,65 @@
 from fastapi import APIRouter, Depends, Form, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
-import redis.asyncio as redis
-
-from src.auth.dependencies import get_current_user, oauth2_scheme
-from src.auth.tokens import create_access_token, create_refresh_token, decode_token
+import asyncio
+import hmac
+
+from src.auth.dependencies import get_current_user, load_user_cached, oauth2_scheme
+from src.auth.passwords import pwd_context
+from src.cache import redis_client
+from src.auth.tokens import (
+    EXP_ACCESS,
+    EXP_REFRESH,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+)
 from src.users.models import User
 from src.database import get_async_session
 from sqlalchemy.future import select
+from sqlalchemy import update
 from src.logs.middleware import logger
-from src.config import REDIS_HOST, REDIS_PORT
+from src.config import settings
 from src.utils.ratelimit import is_blocked, register_failed_attempt, delete_attempt
 from src.utils.ip import get_real_ip
+from src.templates_env import templates
 
-templates = Jinja2Templates(directory="src/templates")
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-redis = redis.Redis(host=REDIS_HOST, port=int(REDIS_PORT), decode_responses=True)
+# Refresh-токены всех пользователей лежат в одном хеше: поле = user_id
+REFRESH_TOKENS_KEY = "refresh_tokens"
+
+# Меняет refresh-токен, только если в Redis лежит именно предъявленный (один round-trip)
+ROTATE_REFRESH_TOKEN_LUA = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+    return 1
+end
+return 0
+"""
+rotate_refresh_token = redis_client.register_script(ROTATE_REFRESH_TOKEN_LUA)
+
+# Общие атрибуты auth-куки, собираются один раз при импорте
+AUTH_COOKIE = dict(httponly=True, secure=True, samesite="Lax", path="/")
+
+
+def set_auth_cookies(response, access_token: str, refresh_token: str) -> None:
+    response.set_cookie("Authorization", f"Bearer {access_token}", max_age=EXP_ACCESS, **AUTH_COOKIE)
+    response.set_cookie("refresh_token", refresh_token, max_age=EXP_REFRESH, **AUTH_COOKIE)
+
+
+PWVERIFY_TTL = 60  # сколько секунд помним успешную проверку пароля
+
+
+def pwverify_key(user_id: int, hashed_password: str, password: str) -> str:
+    # Хеш пароля входит в подпись, поэтому смена пароля сама сбрасывает кэш.
+    # В Redis попадает только HMAC, ни пароль, ни хеш там не хранятся.
+    digest = hmac.new(
+        settings.secret.encode(), f"{user_id}:{hashed_password}:{password}".encode(), "sha256"
+    ).hexdigest()
+    return f"pwverify:{digest}"
+
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -37,43 +76,43 @@ async def login(
     if await is_blocked(ip):
         raise HTTPException(status_code=429, detail="Слишком много попыток. Подождите 10 минут.")
 
-    stmt = select(User).where(User.email == form_data.username)
-    result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+    # Только нужные колонки: без ORM-гидратации, индекс ix_users_email их покрывает
+    stmt = select(User.id, User.hashed_password, User.role).where(User.email == form_data.username)
+    user = (await session.execute(stmt)).first()
+
+    verified = False
+    if user:
+        # Повторный вход в течение PWVERIFY_TTL не пересчитывает bcrypt
+        verify_key = pwverify_key(user.id, user.hashed_password, form_data.password)
+        verified = await redis_client.get(verify_key) is not None
+        if not verified and await asyncio.to_thread(pwd_context.verify, form_data.password, user.hashed_password):
+            verified = True
+            await redis_client.setex(verify_key, PWVERIFY_TTL, "1")
+
+    if not verified:
         await register_failed_attempt(ip)
         logger.warning(f"[LOGIN FAILED] email={form_data.username} ip={ip}")
         raise HTTPException(status_code=401, detail="Неверные данные")
     
     await delete_attempt(ip)
-    logger.info(f"[LOGIN SUCCESS] {user.email} from {ip}")
-    access_token = create_access_token({"sub": str(user.id)})
+    logger.info(f"[LOGIN SUCCESS] {form_data.username} from {ip}")
+
+    # Прозрачная миграция старых bcrypt-хешей на argon2
+    if pwd_context.needs_update(user.hashed_password):
+        new_hash = await asyncio.to_thread(pwd_context.hash, form_data.password)
+        await session.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await session.commit()
+
+    access_token = create_access_token({"sub": str(user.id), "role": user.role.value})
     refresh_token = create_refresh_token({"sub": str(user.id)})
-    await redis.set(f"refresh_token:{user.id}", refresh_token)
+    await redis_client.hset(REFRESH_TOKENS_KEY, str(user.id), refresh_token)
 
     response = RedirectResponse(url="/dashboard", status_code=302)
-    response.set_cookie(
-        key="Authorization",
-        value=f"Bearer {access_token}",
-        httponly=True,
-        secure=True,
-        samesite="Lax",
-        max_age=1800,
-        path="/",
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=True,
-        samesite="Lax",
-        max_age=604800,
-        path="/",
-    )
+    set_auth_cookies(response, access_token, refresh_token)
     return response
 
 @router.post("/refresh")
-async def refresh_token(request: Request):
+async def refresh_token(request: Request, session: AsyncSession = Depends(get_async_session)):
     token = request.cookies.get("refresh_token")
     if not token:
         raise HTTPException(status_code=401, detail="Missing refresh token")
@@ -81,17 +120,19 @@ async def refresh_token(request: Request):
     try:
         payload = decode_token(token)
         user_id = int(payload.get("sub"))
-        saved_token = await redis.get(f"refresh_token:{user_id}")
-        if saved_token != token:
-            raise HTTPException(status_code=401, detail="Token mismatch")
 
-        new_access = create_access_token({"sub": str(user_id)})
+        user = await load_user_cached(user_id, session)
+        if not user or not user.is_active:
+            raise HTTPException(status_code=401, detail="Inactive user")
+
+        new_access = create_access_token({"sub": str(user_id), "role": user.role.value})
         new_refresh = create_refresh_token({"sub": str(user_id)})
-        await redis.set(f"refresh_token:{user_id}", new_refresh)
+        rotated = await rotate_refresh_token(keys=[REFRESH_TOKENS_KEY], args=[str(user_id), token, new_refresh])
+        if not rotated:
+            raise HTTPException(status_code=401, detail="Token mismatch")
 
         response = JSONResponse(content={"message": "Token refreshed"})
-        response.set_cookie("Authorization", f"Bearer {new_access}", httponly=True, secure=True, samesite="Lax", max_age=1800)
-        response.set_cookie("refresh_token", new_refresh, httponly=True, secure=True, samesite="Lax", max_age=604800)
+        set_auth_cookies(response, new_access, new_refresh)
         return response
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
@@ -112,7 +153,7 @@ async def logout_page(request: Request, token: str = Depends(oauth2_scheme)):
     try:
         payload = decode_token(token)
         user_id = int(payload.get("sub"))
-        await redis.delete(f"refresh_token:{user_id}")
+        await redis_client.hdel(REFRESH_TOKENS_KEY, str(user_id))
     except:
         pass
 
@@ -1,23 +1,27 @@
-from datetime import datetime, timedelta
-from jose import jwt
-from src.config import SECRET
+import time
+import jwt
+from src.config import settings
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+EXP_ACCESS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+EXP_REFRESH = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
 
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.now() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET, algorithm="HS256")
+ALGORITHMS = ("HS256",)
+# Декодер с готовыми опциями, чтобы не собирать их на каждый запрос
+_jwt = jwt.PyJWT(options={"require": ["exp", "sub"], "verify_exp": True})
+
+
+def create_access_token(data: dict, expires_in: int = EXP_ACCESS):
+    to_encode = {**data, "exp": int(time.time()) + expires_in}
+    return jwt.encode(to_encode, settings.secret, algorithm="HS256")
 
 
 def create_refresh_token(data: dict):
-    expire = datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {**data, "exp": expire}
-    return jwt.encode(to_encode, SECRET, algorithm="HS256")
+    to_encode = {**data, "exp": int(time.time()) + EXP_REFRESH}
+    return jwt.encode(to_encode, settings.secret, algorithm="HS256")
 
 
 def decode_token(token: str):
-    return jwt.decode(token, SECRET, algorithms=["HS256"])
+    return _jwt.decode(token, settings.secret, algorithms=ALGORITHMS)
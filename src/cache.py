@@ -0,0 +1,15 @@
+import redis.asyncio as redis
+
+from src.config import settings
+
+# Один пул на процесс: все модули ходят в Redis через этот клиент.
+# Блокирующий пул при исчерпании лимита ждёт свободное соединение (до timeout секунд),
+# а не сразу падает с ConnectionError("Too many connections")
+pool = redis.BlockingConnectionPool.from_url(
+    f"redis://{settings.redis_host}:{settings.redis_port}",
+    max_connections=settings.redis_max_connections,
+    timeout=settings.redis_pool_timeout,
+    decode_responses=True,
+    socket_keepalive=True,
+)
+redis_client = redis.Redis(connection_pool=pool)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, DateTime, text
+from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, DateTime, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from src.database import Base, metadata
 from datetime import datetime
@@ -14,6 +14,8 @@ class CoffeeShop(Base):
 
 class CoffeeShiftRecord(Base):
     __tablename__ = "coffee_shift_records"
+    # Одна запись кассы на кофейню в день
+    __table_args__ = (UniqueConstraint("shop_id", "date", name="uq_coffee_shift_records_shop_date"),)
 
     id = Column(Integer, primary_key=True)
     date = Column(Date, nullable=False)
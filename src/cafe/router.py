@@ -1,28 +1,45 @@
-from collections import defaultdict
+import json
 from fastapi import APIRouter, Depends, Form, Query, Request, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert, delete
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import select, insert, update, delete, case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 from datetime import date, timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
 from calendar import monthrange
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
 
+from src.cache import redis_client
 from src.database import get_async_session
 from src.auth.dependencies import get_admin_user
 from src.users.models import User, UserRole
 from src.cafe.models import CoffeeShop, CoffeeShiftRecord
+from src.templates_env import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
+
+STREAM_BATCH = 200  # строк за одну выборку серверного курсора
+
+# Кэшируем сам список кофеен, а не HTML: base.html зависит от query-параметров и cookies
+SHOPS_CACHE_KEY = "cafe:shops"
+SHOPS_CACHE_TTL = 60
+
+_ONE = Decimal("1")
 
 # 🔹 Список кофеен
 @router.get("/", response_class=HTMLResponse)
 async def list_shops(request: Request, session: AsyncSession = Depends(get_async_session), user: User = Depends(get_admin_user)):
-    result = await session.execute(select(CoffeeShop))
-    shops = result.scalars().all()
+    cached = await redis_client.get(SHOPS_CACHE_KEY)
+    if cached:
+        shops = json.loads(cached)
+    else:
+        stmt = select(CoffeeShop.id, CoffeeShop.name).execution_options(yield_per=STREAM_BATCH)
+        result = await session.stream(stmt)
+        shops = [dict(row) async for row in result.mappings()]
+        await redis_client.set(SHOPS_CACHE_KEY, json.dumps(shops), ex=SHOPS_CACHE_TTL)
     return templates.TemplateResponse("cafe/shops_list.html", {"request": request, "shops": shops})
 
 # 🔹 Создание кофейни
@@ -43,6 +60,7 @@ async def create_shop(
     
     await session.execute(insert(CoffeeShop).values(name=name))
     await session.commit()
+    await redis_client.delete(SHOPS_CACHE_KEY)
     return RedirectResponse("/cafe/", status_code=302)
 
 from fastapi import Query
@@ -54,10 +72,14 @@ async def shop_records(
     request: Request,
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user),
-    month: int = Query(date.today().month),
-    year: int = Query(date.today().year),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     sort_by: str = Query("desc")
 ):
+    today = date.today()
+    month = month or today.month
+    year = year or today.year
+
     first_day = date(year, month, 1)
     last_day = date(year, month, monthrange(year, month)[1])
 
@@ -65,7 +87,7 @@ async def shop_records(
         select(CoffeeShiftRecord)
         .where(CoffeeShiftRecord.shop_id == shop_id)
         .where(CoffeeShiftRecord.date.between(first_day, last_day))
-        .options(selectinload(CoffeeShiftRecord.barista))
+        .options(selectinload(CoffeeShiftRecord.barista), raiseload("*"))
     )
 
     if sort_by == "asc":
@@ -73,8 +95,8 @@ async def shop_records(
     else:
         stmt = stmt.order_by(CoffeeShiftRecord.date.desc())
 
-    result = await session.execute(stmt)
-    records = result.scalars().all()
+    result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH))
+    records = [rec async for rec in result.scalars()]
 
     return templates.TemplateResponse("cafe/records_list.html", {
         "request": request,
@@ -104,11 +126,11 @@ async def edit_shop(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
     
-    shop = await session.get(CoffeeShop, shop_id)
-    if not shop:
+    result = await session.execute(update(CoffeeShop).where(CoffeeShop.id == shop_id).values(name=name))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Кофейня не найдена")
-    shop.name = name
     await session.commit()
+    await redis_client.delete(SHOPS_CACHE_KEY)
     return RedirectResponse("/cafe/", status_code=302)
 
 # 🔹 Создание записи кассы
@@ -116,7 +138,7 @@ async def edit_shop(
 async def create_record_page(shop_id: int, request: Request, session: AsyncSession = Depends(get_async_session), user: User = Depends(get_admin_user)):
     csrf_token = await generate_csrf_token(user.id)
 
-    baristas = (await session.execute(select(User).where(User.role == UserRole.COFFEE and User.is_active))).scalars().all()
+    baristas = (await session.execute(select(User).where(User.role == UserRole.COFFEE, User.is_active.is_(True)).options(raiseload("*")))).scalars().all()
     if not baristas:
         raise HTTPException(status_code=400, detail="Нет доступных бариста для создания записи")
     return templates.TemplateResponse("cafe/create_record.html", {"request": request, "shop_id": shop_id, "baristas": baristas, "csrf_token": csrf_token})
@@ -137,15 +159,12 @@ async def create_record(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
     
-    record = (await session.execute(select(CoffeeShiftRecord).where(CoffeeShiftRecord.date == date_ and CoffeeShiftRecord.shop_id == shop_id))).scalars().all()
-    if record:
-        return HTTPException(status_code=400, detail="Запись существует")
-
     barista = await session.get(User, barista_id)
     if not barista or barista.role != UserRole.COFFEE:
         raise HTTPException(status_code=400, detail="Неверный бариста")
 
-    stmt = insert(CoffeeShiftRecord).values(
+    # Дубликат (shop_id, date) отсекает сам INSERT, без предварительного SELECT
+    stmt = pg_insert(CoffeeShiftRecord).values(
         date=date_,
         total_cash=total_cash,
         terminal=terminal,
@@ -153,8 +172,11 @@ async def create_record(
         expenses=expenses,
         shop_id=shop_id,
         barista_id=barista_id
-    )
-    await session.execute(stmt)
+    ).on_conflict_do_nothing(constraint="uq_coffee_shift_records_shop_date")
+    result = await session.execute(stmt)
+    if result.rowcount == 0:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Запись существует")
     await session.commit()
     return RedirectResponse(f"/cafe/{shop_id}/records", status_code=302)
 
@@ -162,10 +184,10 @@ async def create_record(
 async def edit_record_page(shop_id: int, record_id: int, request: Request, session: AsyncSession = Depends(get_async_session), user: User = Depends(get_admin_user)):
     csrf_token = await generate_csrf_token(user.id)
     
-    record = await session.get(CoffeeShiftRecord, record_id)
+    record = await session.get(CoffeeShiftRecord, record_id, options=[raiseload("*")])
     if not record:
         raise HTTPException(status_code=404, detail="Запись не найдена")
-    baristas = (await session.execute(select(User).where(User.role == UserRole.COFFEE and User.is_active))).scalars().all()
+    baristas = (await session.execute(select(User).where(User.role == UserRole.COFFEE, User.is_active.is_(True)).options(raiseload("*")))).scalars().all()
     return templates.TemplateResponse("cafe/edit_record.html", {"request": request, "record": record, "baristas": baristas, "shop_id": shop_id, "csrf_token": csrf_token})
 
 @router.post("/{shop_id}/records/edit/{record_id}")
@@ -185,15 +207,25 @@ async def edit_record(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
     
-    record = await session.get(CoffeeShiftRecord, record_id)
-    if not record:
+    stmt = (
+        update(CoffeeShiftRecord)
+        .where(CoffeeShiftRecord.id == record_id)
+        .values(
+            date=date_,
+            total_cash=total_cash,
+            terminal=terminal,
+            cash=cash,
+            expenses=expenses,
+            barista_id=barista_id,
+        )
+    )
+    try:
+        result = await session.execute(stmt)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Запись на эту дату уже существует")
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Запись не найдена")
-    record.date = date_
-    record.total_cash = total_cash
-    record.terminal = terminal
-    record.cash = cash
-    record.expenses = expenses
-    record.barista_id = barista_id
     await session.commit()
     return RedirectResponse(f"/cafe/{shop_id}/records", status_code=302)
 
@@ -204,104 +236,119 @@ async def delete_record(shop_id: int, record_id: int, session: AsyncSession = De
     await session.commit()
     return RedirectResponse(f"/cafe/{shop_id}/records", status_code=302)
 
+def _enrich_day(day: date, rec: CoffeeShiftRecord | None) -> dict:
+    if rec is None:
+        return {"record": None, "payout": 0, "percent": 0, "date": day}
+    base = rec.barista.default_rate or 0
+    perc = rec.barista.default_percent or 0
+    # Округление как у ROUND() в Postgres, чтобы строки сходились с итогами
+    payout = (base + rec.total_cash * perc / 100).quantize(_ONE, rounding=ROUND_HALF_UP)
+    return {"record": rec, "payout": int(payout), "percent": perc}
+
+
 @router.get("/{shop_id}/reports", response_class=HTMLResponse)
 async def cafe_report(
     shop_id: int,
     request: Request,
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user),
-    month: int = Query(date.today().month),
-    year: int = Query(date.today().year)
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None)
 ):
+    today = date.today()
+    month = month or today.month
+    year = year or today.year
+
     first_day = date(year, month, 1)
     last_day = date(year, month, monthrange(year, month)[1])
     mid_day = date(year, month, 15)
+    halves = {1: "1–15", 2: "16–конец"}
+
+    in_month = (
+        CoffeeShiftRecord.shop_id == shop_id,
+        CoffeeShiftRecord.date.between(first_day, last_day),
+    )
 
     stmt = (
         select(CoffeeShiftRecord)
-        .where(CoffeeShiftRecord.shop_id == shop_id)
-        .where(CoffeeShiftRecord.date.between(first_day, last_day))
-        .options(joinedload(CoffeeShiftRecord.barista))
+        .where(*in_month)
+        .options(joinedload(CoffeeShiftRecord.barista), raiseload("*"))
     )
     all_records = (await session.execute(stmt)).scalars().all()
     records_by_date = {r.date: r for r in all_records}
 
-    def generate_enriched_range(start: date, end: date):
-        result = []
-        current = start
-        while current <= end:
-            rec = records_by_date.get(current)
-            if rec:
-                base = rec.barista.default_rate or 0
-                perc = rec.barista.default_percent or 0
-                payout = float(base) + float(rec.total_cash) * float(perc) / 100
-                result.append({
-                    "record": rec,
-                    "payout": round(payout),
-                    "percent": perc
-                })
-            else:
-                result.append({
-                    "record": None,
-                    "payout": 0,
-                    "percent": 0,
-                    "date": current
-                })
-            current += timedelta(days=1)
-        return result
-
-    def get_summary(enriched):
-        total_cash = 0
-        total_terminal = 0
-        total_cash_only = 0
-        total_expenses = 0
-        total_salary = 0
-        users = defaultdict(lambda: {"name": "", "percent": 0, "total": 0})
-
-        for r in enriched:
-            rec = r.get("record")
-            if rec:
-                total_cash += float(rec.total_cash)
-                total_terminal += float(rec.terminal)
-                total_cash_only += float(rec.cash)
-                total_expenses += float(rec.expenses)
-                total_salary += r["payout"]
-                u = rec.barista
-                users[u.id]["name"] = u.name
-                users[u.id]["percent"] = r["percent"]
-                users[u.id]["total"] += r["payout"]
-
-        return {
-            "records": enriched,
-            "total_cash": round(total_cash),
-            "total_terminal": round(total_terminal),
-            "total_cash_only": round(total_cash_only),
-            "total_expenses": round(total_expenses),
-            "total_salary": round(total_salary),
-            "net_profit": round(total_cash - total_expenses - total_salary),
-            "user_summary": users
-        }
+    # Итоги и ЗП считает БД: половина месяца определяется прямо в запросе
+    half = case((CoffeeShiftRecord.date <= mid_day, 1), else_=2).label("half")
+    payout = func.round(
+        func.coalesce(User.default_rate, 0)
+        + CoffeeShiftRecord.total_cash * func.coalesce(User.default_percent, 0) / 100
+    )
 
-    enriched_1_15 = generate_enriched_range(first_day, mid_day)
-    enriched_16_31 = generate_enriched_range(mid_day.replace(day=16), last_day)
+    totals_stmt = (
+        select(
+            half,
+            func.sum(CoffeeShiftRecord.total_cash).label("total_cash"),
+            func.sum(CoffeeShiftRecord.terminal).label("total_terminal"),
+            func.sum(CoffeeShiftRecord.cash).label("total_cash_only"),
+            func.sum(CoffeeShiftRecord.expenses).label("total_expenses"),
+            func.sum(payout).label("total_salary"),
+        )
+        .join(User, User.id == CoffeeShiftRecord.barista_id)
+        .where(*in_month)
+        .group_by(half)
+    )
+    totals = {
+        label: {"total_cash": 0, "total_terminal": 0, "total_cash_only": 0, "total_expenses": 0, "total_salary": 0, "net_profit": 0}
+        for label in halves.values()
+    }
+    for row in (await session.execute(totals_stmt)).all():
+        t = totals[halves[row.half]]
+        t.update(
+            total_cash=row.total_cash,
+            total_terminal=row.total_terminal,
+            total_cash_only=row.total_cash_only,
+            total_expenses=row.total_expenses,
+            total_salary=int(row.total_salary),
+        )
+        t["net_profit"] = row.total_cash - row.total_expenses - t["total_salary"]
 
-    summary_1_15 = get_summary(enriched_1_15)
-    summary_16_31 = get_summary(enriched_16_31)
+    users_stmt = (
+        select(
+            half,
+            User.id,
+            User.name,
+            User.default_percent,
+            func.sum(payout).label("total"),
+        )
+        .join(User, User.id == CoffeeShiftRecord.barista_id)
+        .where(*in_month)
+        .group_by(half, User.id, User.name, User.default_percent)
+    )
+    user_summary = {label: {} for label in halves.values()}
+    for row in (await session.execute(users_stmt)).all():
+        user_summary[halves[row.half]][row.id] = {
+            "name": row.name,
+            "percent": row.default_percent or 0,
+            "total": int(row.total),
+        }
+
+    def generate_enriched_range(start: date, end: date):
+        get_record = records_by_date.get
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return [_enrich_day(day, get_record(day)) for day in days]
 
     return templates.TemplateResponse("cafe/cafe_report.html", {
         "request": request,
         "shop_id": shop_id,
         "month": month,
         "year": year,
-        "first_half": summary_1_15["records"],
-        "second_half": summary_16_31["records"],
+        "first_half": generate_enriched_range(first_day, mid_day),
+        "second_half": generate_enriched_range(mid_day.replace(day=16), last_day),
         "first_start": first_day,
         "first_end": mid_day,
         "second_start": mid_day.replace(day=16),
         "second_end": last_day,
-        "user_summary": {
-            "1–15": summary_1_15["user_summary"],
-            "16–конец": summary_16_31["user_summary"]
-        },
+        "totals": totals,
+        "user_summary": user_summary,
         "user": user,
     })
@@ -1,33 +1,100 @@
+from dataclasses import dataclass
+from typing import Optional
+
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-DB_HOST = os.environ.get("DB_HOST")
-DB_PORT = os.environ.get("DB_PORT")
-DB_NAME = os.environ.get("DB_NAME")
-DB_USER = os.environ.get("DB_USER")
-DB_PASS = os.environ.get("DB_PASS")
 
-REDIS_PORT = os.environ.get("REDIS_PORT")
-REDIS_HOST = os.environ.get("REDIS_HOST")
+def _required(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(f"Не задана переменная окружения {name}")
+    return value
+
+
+def _int(name: str, default: Optional[int] = None) -> int:
+    value = os.environ.get(name)
+    if not value:
+        if default is None:
+            raise RuntimeError(f"Не задана переменная окружения {name}")
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(f"Переменная окружения {name} должна быть целым числом, получено {value!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    db_host: str
+    db_port: str
+    db_name: str
+    db_user: str
+    db_pass: str
+    db_pool_size: int
+    db_max_overflow: int
+
+    redis_host: str
+    redis_port: int
+    redis_max_connections: int
+    redis_pool_timeout: int
+
+    secret: str
+    secret_manager: Optional[str]
+
+    tg_bot_token: Optional[str]
+    tg_chat_id: Optional[str]
+
+    admin_email: Optional[str]
+    admin_password: Optional[str]
+    admin_name: Optional[str]
+    admin_role: Optional[str]
+
+    manager_email: Optional[str]
+    manager_password: Optional[str]
+    manager_name: Optional[str]
+    manager_role: Optional[str]
+
+    csrf_token_expiry: int
+
+    celery_bachup_rate: int
+
+
+# Читаем и проверяем окружение один раз при импорте: ошибка конфигурации
+# видна сразу при старте, а не на первом запросе
+settings = Settings(
+    db_host=_required("DB_HOST"),
+    db_port=_required("DB_PORT"),
+    db_name=_required("DB_NAME"),
+    db_user=_required("DB_USER"),
+    db_pass=_required("DB_PASS"),
+    db_pool_size=_int("DB_POOL_SIZE", 20),
+    db_max_overflow=_int("DB_MAX_OVERFLOW", 10),
+
+    redis_host=_required("REDIS_HOST"),
+    redis_port=_int("REDIS_PORT"),
+    redis_max_connections=_int("REDIS_MAX_CONNECTIONS", 64),
+    redis_pool_timeout=_int("REDIS_POOL_TIMEOUT", 5),
 
-SECRET = os.environ.get("SECRET")
-SECRET_MANAGER = os.environ.get("SECRET_MANAGER")
+    secret=_required("SECRET"),
+    secret_manager=os.environ.get("SECRET_MANAGER"),
 
-TG_BOT_TOKEN = os.environ.get("TG_BOT_TOKEN")
-TG_CHAT_ID = os.environ.get("TG_CHAT_ID")
+    tg_bot_token=os.environ.get("TG_BOT_TOKEN"),
+    tg_chat_id=os.environ.get("TG_CHAT_ID"),
 
-ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL")
-ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
-ADMIN_NAME = os.environ.get("ADMIN_NAME")
-ADMIN_ROLE = os.environ.get("ADMIN_ROLE")
+    admin_email=os.environ.get("ADMIN_EMAIL"),
+    admin_password=os.environ.get("ADMIN_PASSWORD"),
+    admin_name=os.environ.get("ADMIN_NAME"),
+    admin_role=os.environ.get("ADMIN_ROLE"),
 
-MANAGER_EMAIL = os.environ.get("MANAGER_EMAIL")
-MANAGER_PASSWORD = os.environ.get("MANAGER_PASSWORD")
-MANAGER_NAME = os.environ.get("MANAGER_NAME")
-MANAGER_ROLE = os.environ.get("MANAGER_ROLE")
+    manager_email=os.environ.get("MANAGER_EMAIL"),
+    manager_password=os.environ.get("MANAGER_PASSWORD"),
+    manager_name=os.environ.get("MANAGER_NAME"),
+    manager_role=os.environ.get("MANAGER_ROLE"),
 
-CSRF_TOKEN_EXPIRY = int(os.environ.get("CSRF_TOKEN_EXPIRY"))
+    csrf_token_expiry=_int("CSRF_TOKEN_EXPIRY"),
 
-CELERY_BACHUP_RATE = int(os.environ.get("CELERY_BACHUP_RATE"))
+    celery_bachup_rate=_int("CELERY_BACHUP_RATE"),
+)
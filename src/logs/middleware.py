@@ -1,13 +1,19 @@
 from datetime import datetime
+import asyncio
+import atexit
+import functools
 import logging
+import logging.handlers
+import queue
+import time
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+from sqlalchemy import insert
 from src.database import async_session_maker
 from src.logs.models import UserLog
 from src.auth.tokens import decode_token
 from src.users.models import User
-import re
 import os
 
 from src.utils.ip import get_real_ip
@@ -16,49 +22,130 @@ logfile_path = "/fastapi_app/logs/user_activity.log"
 os.makedirs(os.path.dirname(logfile_path), exist_ok=True)
 
 logger = logging.getLogger("user_logger")
-handler = logging.FileHandler(logfile_path)
+# Запись в файл идёт в отдельном потоке, event loop только кладёт запись в очередь
+_log_records = queue.Queue(-1)
+file_handler = logging.FileHandler(logfile_path)
+listener = logging.handlers.QueueListener(_log_records, file_handler)
+listener.start()
+atexit.register(listener.stop)
 logger.setLevel(logging.INFO)
-logger.addHandler(handler)
+logger.addHandler(logging.handlers.QueueHandler(_log_records))
+
+# Запись UserLog вынесена из запроса: middleware кладёт строку в очередь,
+# фоновая задача пишет их в БД пачками одним INSERT
+LOG_QUEUE_MAXSIZE = 10000
+LOG_BATCH_SIZE = 500
+log_queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+
+
+async def _write_batch(batch: list[dict]):
+    async with async_session_maker() as session:
+        await session.execute(insert(UserLog), batch)
+        await session.commit()
+
+
+# Маркер остановки: консьюмер дописывает текущую пачку и завершается сам,
+# поэтому пачка, уже снятая с очереди, не теряется (как при cancel() во время INSERT)
+_STOP = object()
+
+
+async def log_consumer():
+    stop = False
+    while not stop:
+        batch = []
+        item = await log_queue.get()
+        while True:
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+            if log_queue.empty() or len(batch) >= LOG_BATCH_SIZE:
+                break
+            item = log_queue.get_nowait()
+        if not batch:
+            continue
+        try:
+            await _write_batch(batch)
+        except Exception:
+            logger.exception(f"[USER LOG] не удалось записать {len(batch)} записей")
+
+
+async def stop_log_consumer(task: asyncio.Task):
+    # Маркер встаёт в конец очереди: всё, что было до него, консьюмер запишет
+    if not task.done():
+        await log_queue.put(_STOP)
+        await task
+
+
+async def flush_log_queue():
+    # Дописываем остаток очереди при остановке приложения
+    batch = []
+    while not log_queue.empty():
+        batch.append(log_queue.get_nowait())
+    if batch:
+        await _write_batch(batch)
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_cached(token: str) -> dict:
+    # Браузер шлёт один и тот же токен много раз подряд — подпись проверяем один раз.
+    # Ошибки декодирования не кэшируются, а exp проверяется при каждом обращении
+    return decode_token(token)
+
+
+# Пути, которые не логируем
+SKIP_PREFIXES = ("/static", "/media", "/uploads", "/favicon", "/auth/refresh")
+# CORS preflight и health-check HEAD не являются действиями пользователя
+SKIP_METHODS = frozenset({"OPTIONS", "HEAD"})
 
 
 class LogUserActionMiddleware(BaseHTTPMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Служебные запросы отдаём приложению напрямую, минуя обёртку
+        # BaseHTTPMiddleware (Request, потоки тела ответа, задачи)
+        if scope["type"] == "http" and (
+            scope["method"] in SKIP_METHODS or scope["path"].startswith(SKIP_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
     async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        method = request.method
+
         token = request.cookies.get("Authorization", "").replace("Bearer ", "")
         user_id = None
         if token:
             try:
-                payload = decode_token(token)
-                user_id = int(payload.get("sub"))
+                payload = _decode_cached(token)
+                if payload["exp"] > time.time():
+                    user_id = int(payload.get("sub"))
             except:
                 pass
 
-        path = request.url.path
-        method = request.method
         query = str(request.url.query)
         ip = await get_real_ip(request)
         ua = request.headers.get("user-agent", "unknown")
 
-        skip = re.match(r"/(static|favicon|auth/refresh)", path)
-        if skip:
-            return await call_next(request)
-
         response = await call_next(request)
         status_code = response.status_code
 
         logger.info(f"[{datetime.now()}] {ip} {user_id} {method} {path}?{query} UA={ua} {status_code}")
 
-        async with async_session_maker() as session:
-            log = UserLog(
-                user_id=user_id,
-                action=f"{method} {path}" + (f"?{query}" if query else ""),
-                path=path,
-                ip_address=ip,
-                user_agent=ua[:250],
-                status_code=status_code,
-                query_string=query
-            )
-            session.add(log)
-            await session.commit()
+        try:
+            log_queue.put_nowait({
+                "timestamp": datetime.utcnow(),
+                "user_id": user_id,
+                "action": f"{method} {path}" + (f"?{query}" if query else ""),
+                "path": path,
+                "ip_address": ip,
+                "user_agent": ua[:250],
+                "status_code": status_code,
+                "query_string": query,
+            })
+        except asyncio.QueueFull:
+            logger.warning(f"[USER LOG] очередь переполнена, запись {method} {path} пропущена")
 
         return response
 
@@ -8,7 +8,7 @@ class UserLog(Base):
     __tablename__ = "user_logs"
 
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     user_id = Column(ForeignKey("users.id"), nullable=True)
     action = Column(String, nullable=False)
     path = Column(String, nullable=True)
@@ -1,43 +1,47 @@
 # src/logs/router.py
+from datetime import datetime
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import joinedload, raiseload
 from src.database import get_async_session
 from src.auth.dependencies import get_admin_user
 from src.logs.models import UserLog
 from src.users.models import User
+from src.templates_env import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
+
+STREAM_BATCH = 200  # строк за одну выборку серверного курсора
 
 @router.get("/", response_class=HTMLResponse)
 async def show_logs(
     request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
+    before: Optional[datetime] = Query(None),
+    before_id: Optional[int] = Query(None),
     session: AsyncSession = Depends(get_async_session),
     admin: User = Depends(get_admin_user)
 ):
-    offset = (page - 1) * limit
-
-    # общее количество логов
-    total_q = await session.execute(select(UserLog))
-    total_logs = total_q.scalars().all()
-    total_count = len(total_logs)
-    total_pages = (total_count + limit - 1) // limit
-
+    # Keyset-пагинация: следующая страница начинается после последней строки
+    # текущей (timestamp, id), без OFFSET и без подсчёта всех логов
     stmt = (
         select(UserLog)
-        .options(joinedload(UserLog.user))
-        .order_by(UserLog.timestamp.desc())
-        .offset(offset)
-        .limit(limit)
+        .options(joinedload(UserLog.user), raiseload("*"))
+        .order_by(UserLog.timestamp.desc(), UserLog.id.desc())
+        .limit(limit + 1)
     )
-    result = await session.execute(stmt)
-    logs = result.scalars().all()
+    if before is not None and before_id is not None:
+        stmt = stmt.where(tuple_(UserLog.timestamp, UserLog.id) < tuple_(before, before_id))
+
+    result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH))
+    logs = [log async for log in result.scalars()]
+    has_next = len(logs) > limit
+    logs = logs[:limit]
 
     return templates.TemplateResponse("logs/list.html", {
         "request": request,
@@ -45,5 +49,7 @@ async def show_logs(
         "user": admin,
         "page": page,
         "limit": limit,
-        "total_pages": total_pages
+        "has_next": has_next,
+        "next_before": logs[-1].timestamp.isoformat() if has_next else None,
+        "next_before_id": logs[-1].id if has_next else None,
     })
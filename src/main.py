@@ -1,21 +1,18 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.params import Depends
 from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
-from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
-from sqlalchemy.exc import IntegrityError
+from src.cache import pool as redis_pool
 
-import redis.asyncio as redis
-
-from src.auth.dependencies import get_admin_user, get_current_user, get_manager_or_admin, get_cashier_or_manager_or_admin
-from src.users.models import User, UserRole
+from src.auth.dependencies import get_admin_user, get_current_user, get_cashier_or_manager_or_admin
+from src.users.models import User
 
 from src.auth.router import router as auth_router
 from src.users.router import router as users_router
@@ -27,36 +24,33 @@ from src.stores.router import router as stores_router
 from src.notifications.router import router as notifications_router
 
 from src.utils.create_preconfig_users import create_user
-from src.config import (
-    ADMIN_EMAIL, ADMIN_PASSWORD, ADMIN_NAME, ADMIN_ROLE,
-    MANAGER_EMAIL, MANAGER_PASSWORD, MANAGER_NAME, MANAGER_ROLE,
-)
+from src.config import settings
 
-from src.logs.middleware import LogUserActionMiddleware
+from src.logs.middleware import LogUserActionMiddleware, flush_log_queue, log_consumer, stop_log_consumer
+from src.templates_env import templates
+from src.utils.static import CachedStaticFiles
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     os.makedirs("tmp", exist_ok=True)
     os.makedirs("src/static", exist_ok=True)
-    await create_user(role=ADMIN_ROLE, email=ADMIN_EMAIL, name=ADMIN_NAME, password=ADMIN_PASSWORD, default_rate=0.0, default_percent=1.0)
-    await create_user(role=MANAGER_ROLE, email=MANAGER_EMAIL, name=MANAGER_NAME, password=MANAGER_PASSWORD, default_rate=1000.0, default_percent=0.0)
+    await create_user(role=settings.admin_role, email=settings.admin_email, name=settings.admin_name, password=settings.admin_password, default_rate=0.0, default_percent=1.0)
+    await create_user(role=settings.manager_role, email=settings.manager_email, name=settings.manager_name, password=settings.manager_password, default_rate=1000.0, default_percent=0.0)
+    log_writer = asyncio.create_task(log_consumer())
     yield
-    # Cleanup actions can be added here if needed
+    await stop_log_consumer(log_writer)
+    # Записи, попавшие в очередь уже после маркера остановки
+    await flush_log_queue()
+    await redis_pool.disconnect()
 
 app = FastAPI(lifespan=lifespan, title="Dobrotno App", description="A FastAPI application for Dobrotno Shop", version="0.0.1")
 
-templates = Jinja2Templates(directory="src/templates")
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="src/static"), name="static")
 # app.mount("/media", StaticFiles(directory="src/media"), name="media")
 # app.mount("/uploads", StaticFiles(directory="src/uploads"), name="uploads")
 
 app.add_middleware(LogUserActionMiddleware)
 
-origins = [
-    "http://localhost",
-    "http://localhost:8000",
-]
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],
@@ -66,6 +60,9 @@ app.add_middleware(
                           # "Access-Control-Allow-Origin", "Authorization"
 )
 
+# Сжатие ответов; добавлено последним, поэтому оборачивает все остальные middleware
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 @app.get("/", response_class=HTMLResponse)
 async def public_root(request: Request):
     return templates.TemplateResponse("auth/login.html", {"request": request})
@@ -1,27 +1,36 @@
 from datetime import datetime
-from enum import Enum
+from enum import IntEnum
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum as SqlEnum
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Boolean, CheckConstraint, ForeignKey, Index, Text, text
 from sqlalchemy.orm import relationship
 from src.database import Base, metadata
 
 
-class NotificationType(str, Enum):
-    INFO = "info"
-    WARNING = "warning"
-    SUCCESS = "success"
-    ERROR = "error"
+class NotificationType(IntEnum):
+    # Хранится в БД как smallint
+    INFO = 0
+    WARNING = 1
+    SUCCESS = 2
+    ERROR = 3
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def from_label(cls, label: str) -> "NotificationType":
+        return cls[label.upper()]
 
 
 class Notification(Base):
     __tablename__ = "notifications"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
-    type = Column(SqlEnum(NotificationType), nullable=False, default=NotificationType.INFO)
-    is_read = Column(Boolean, default=False, nullable=False, index=True)
+    type = Column(SmallInteger, nullable=False, default=NotificationType.INFO)
+    is_read = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     read_at = Column(DateTime, nullable=True)
 
@@ -30,3 +39,18 @@ class Notification(Base):
 
     # Relationship
     user = relationship("User", backref="notifications")
+
+    @property
+    def type_label(self) -> str:
+        """Строковый тип для шаблонов: info / warning / success / error"""
+        return NotificationType(self.type).label
+
+    __table_args__ = (
+        # Выборка по пользователю; для фильтра по is_read страница в порядке
+        # created_at DESC читается прямо из индекса, без сортировки
+        Index("ix_notifications_user_unread_created", user_id, is_read, created_at.desc()),
+        # Счётчик непрочитанных (колокольчик) опрашивается часто; частичный индекс
+        # содержит только непрочитанные строки
+        Index("ix_notifications_user_unread_only", user_id, postgresql_where=text("is_read = false")),
+        CheckConstraint("type BETWEEN 0 AND 3", name="ck_notifications_type"),
+    )
@@ -1,20 +1,27 @@
+import re
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, insert, update, func, desc, literal
 
 from src.auth.dependencies import get_current_user, get_admin_user
 from src.notifications.models import Notification, NotificationType
 from src.users.models import User
 from src.database import get_async_session
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
-templates = Jinja2Templates(directory="src/templates")
+# id получателей из строки вида "1, 2,3"
+_UID_RE = re.compile(r"\d+")
+_UID_LIST_RE = re.compile(r"[\d,\s]*")
+MAX_TARGET_USERS = 10000
+
+# Шаблон горячего списка разрешаем один раз при импорте, рендер синхронный
+NOTIF_LIST_TPL = templates.get_template("notifications/list.html")
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -28,17 +35,16 @@ async def list_notifications(
 ):
     """Список уведомлений текущего пользователя"""
 
-    # Фильтры
+    # Обе цифры (всего и непрочитанных) одним запросом
+    counts_stmt = select(
+        func.count(Notification.id).label("total"),
+        func.count(Notification.id).filter(Notification.is_read == False).label("unread"),
+    ).where(Notification.user_id == user.id)
+
     filters = [Notification.user_id == user.id]
     if unread_only:
         filters.append(Notification.is_read == False)
 
-    # Подсчет общего количества
-    stmt_count = select(func.count(Notification.id)).where(*filters)
-    result_count = await session.execute(stmt_count)
-    total = result_count.scalar() or 0
-
-    # Получение уведомлений с пагинацией
     offset = (page - 1) * per_page
     stmt = (
         select(Notification)
@@ -47,36 +53,27 @@ async def list_notifications(
         .limit(per_page)
         .offset(offset)
     )
-    result = await session.execute(stmt)
-    notifications = result.scalars().all()
 
-    # Подсчет непрочитанных
-    stmt_unread = select(func.count(Notification.id)).where(
-        Notification.user_id == user.id,
-        Notification.is_read == False
-    )
-    result_unread = await session.execute(stmt_unread)
-    unread_count = result_unread.scalar() or 0
+    counts = (await session.execute(counts_stmt)).one()
+    notifications = (await session.execute(stmt)).scalars().all()
+    csrf_token = await generate_csrf_token(user.id)
+    unread_count = counts.unread
+    total = unread_count if unread_only else counts.total
 
     total_pages = (total + per_page - 1) // per_page
 
-    csrf_token = await generate_csrf_token(user.id)
-
-    return templates.TemplateResponse(
-        "notifications/list.html",
-        {
-            "request": request,
-            "user": user,
-            "notifications": notifications,
-            "unread_count": unread_count,
-            "page": page,
-            "per_page": per_page,
-            "total": total,
-            "total_pages": total_pages,
-            "unread_only": unread_only,
-            "csrf_token": csrf_token,
-        },
-    )
+    return HTMLResponse(NOTIF_LIST_TPL.render(
+        request=request,
+        user=user,
+        notifications=notifications,
+        unread_count=unread_count,
+        page=page,
+        per_page=per_page,
+        total=total,
+        total_pages=total_pages,
+        unread_only=unread_only,
+        csrf_token=csrf_token,
+    ))
 
 
 @router.post("/{notification_id}/read")
@@ -91,19 +88,28 @@ async def mark_as_read(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
 
-    stmt = select(Notification).where(
-        Notification.id == notification_id,
-        Notification.user_id == user.id
+    stmt = (
+        update(Notification)
+        .where(
+            Notification.id == notification_id,
+            Notification.user_id == user.id,
+            Notification.is_read == False,
+        )
+        .values(is_read=True, read_at=datetime.utcnow())
+        .returning(Notification.id)
+        .execution_options(synchronize_session=False)
     )
     result = await session.execute(stmt)
-    notification = result.scalar()
-
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
 
-    if not notification.is_read:
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
+    if result.scalar_one_or_none() is None:
+        # Ничего не обновили: либо уже прочитано, либо уведомления нет
+        exists_stmt = select(Notification.id).where(
+            Notification.id == notification_id,
+            Notification.user_id == user.id
+        )
+        if (await session.execute(exists_stmt)).scalar() is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
+    else:
         await session.commit()
 
     return RedirectResponse("/notifications", status_code=303)
@@ -120,17 +126,14 @@ async def mark_all_as_read(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
 
-    stmt = select(Notification).where(
-        Notification.user_id == user.id,
-        Notification.is_read == False
+    # read_at пишем в UTC, как и created_at, а не через now() сервера БД
+    stmt = (
+        update(Notification)
+        .where(Notification.user_id == user.id, Notification.is_read == False)
+        .values(is_read=True, read_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
     )
-    result = await session.execute(stmt)
-    notifications = result.scalars().all()
-
-    for notification in notifications:
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-
+    await session.execute(stmt)
     await session.commit()
 
     return RedirectResponse("/notifications", status_code=303)
@@ -206,26 +209,54 @@ async def create_notification(
     if not csrf_token or not await verify_csrf_token(admin.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
 
-    # Определяем целевых пользователей
-    target_user_ids = []
+    # Проверяем ввод один раз, до любых запросов к БД
+    try:
+        notification_type = NotificationType.from_label(type)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid notification type")
+    related_url = related_url or None
+
     if user_ids.strip().lower() == "all":
-        stmt = select(User.id).where(User.is_active == True)
-        result = await session.execute(stmt)
-        target_user_ids = [row[0] for row in result.all()]
-    else:
-        target_user_ids = [int(uid.strip()) for uid in user_ids.split(",") if uid.strip()]
-
-    # Создаем уведомления для каждого пользователя
-    for user_id in target_user_ids:
-        notification = Notification(
-            user_id=user_id,
-            title=title,
-            message=message,
-            type=NotificationType(type),
-            related_url=related_url if related_url else None,
+        # Рассылка всем активным: INSERT ... SELECT целиком на стороне БД
+        source = select(
+            User.id,
+            literal(title),
+            literal(message),
+            literal(notification_type, type_=Notification.type.type),
+            literal(related_url, type_=Notification.related_url.type),
+            literal(False),
+            func.timezone("utc", func.now()),
+        ).where(User.is_active == True)
+        await session.execute(
+            insert(Notification).from_select(
+                ["user_id", "title", "message", "type", "related_url", "is_read", "created_at"],
+                source,
+            )
         )
-        session.add(notification)
-
+        await session.commit()
+        return RedirectResponse("/notifications", status_code=303)
+
+    # Только цифры, запятые и пробелы: "12a3" не должно превращаться в 12 и 3
+    if not _UID_LIST_RE.fullmatch(user_ids):
+        raise HTTPException(status_code=400, detail="Invalid user ids")
+    target_user_ids = list(map(int, _UID_RE.findall(user_ids)))
+    if not target_user_ids:
+        raise HTTPException(status_code=400, detail="No recipients")
+    if len(target_user_ids) > MAX_TARGET_USERS:
+        raise HTTPException(status_code=400, detail="Too many recipients")
+
+    # Одна многострочная вставка вместо INSERT на каждого пользователя
+    rows = [
+        {
+            "user_id": user_id,
+            "title": title,
+            "message": message,
+            "type": notification_type,
+            "related_url": related_url,
+        }
+        for user_id in target_user_ids
+    ]
+    await session.execute(insert(Notification), rows)
     await session.commit()
 
     return RedirectResponse("/notifications", status_code=303)
@@ -238,7 +269,8 @@ async def get_unread_count(
 ):
     """API endpoint для получения количества непрочитанных уведомлений"""
 
-    stmt = select(func.count(Notification.id)).where(
+    # count(*) без обращения к колонкам - index-only scan по частичному индексу
+    stmt = select(func.count()).select_from(Notification).where(
         Notification.user_id == user.id,
         Notification.is_read == False
     )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from sqlalchemy import Column, DateTime, Integer, String, Date, Numeric, ForeignKey, Boolean, Time
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from src.database import Base, metadata
 
 
@@ -30,7 +30,9 @@ class StoreShiftRecord(Base):
     receipt = Column(Numeric(10, 2), nullable=False, default=0)
     expenses = Column(Numeric(10, 2), nullable=False, default=0)
     salary_expenses = Column(Numeric(10, 2), nullable=False, default=0)
-    comments = Column(JSONB, nullable=False, default=dict)
+    # Комментарии нужны только на странице редактирования: не грузим и не парсим
+    # JSONB в списках смен (там, где нужны, подключаются через undefer)
+    comments = deferred(Column(JSONB, nullable=False, default=dict))
 
     store = relationship("Store", backref="records")
     employees = relationship("StoreShiftEmployee", back_populates="shift")
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, Form, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import or_, select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer
 from typing import List
 from datetime import date, timedelta, datetime, time
 from decimal import Decimal, ROUND_HALF_UP
@@ -13,16 +12,15 @@ from src.database import get_async_session
 from src.auth.dependencies import get_admin_user, get_cashier_or_manager_or_admin, get_manager_or_admin
 from src.users.models import User, UserRole
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
 from src.stores.models import Store, StoreShiftRecord, StoreShiftEmployee, StoreVacation
 from src.tiktok.reports.service import get_half_month_periods
 from src.payouts.models import Payout, RoleType, Location
 
 from src.stores.service import aggregate_vacation_amounts, compute_salary, fetch_vacations, get_config_manager, get_payouts_for_period, get_vacations_for_period, summarize_salaries, summarize_vacations
 
-from src.config import MANAGER_EMAIL, MANAGER_ROLE
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -526,7 +524,10 @@ async def edit_record_page(
     record = await session.get(
         StoreShiftRecord,
         record_id,
-        options=[selectinload(StoreShiftRecord.employees).selectinload(StoreShiftEmployee.user)],
+        options=[
+            selectinload(StoreShiftRecord.employees).selectinload(StoreShiftEmployee.user),
+            undefer(StoreShiftRecord.comments),
+        ],
     )
     if not record or record.store_id != store_id:
         raise HTTPException(status_code=404, detail="Смена не найдена")
@@ -618,7 +619,9 @@ async def edit_record(
     if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
     record = await session.get(
-        StoreShiftRecord, record_id, options=[selectinload(StoreShiftRecord.employees)]
+        StoreShiftRecord,
+        record_id,
+        options=[selectinload(StoreShiftRecord.employees), undefer(StoreShiftRecord.comments)],
     )
     if not record or record.store_id != store_id:
         raise HTTPException(status_code=404, detail="Смена не найдена")
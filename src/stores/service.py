@@ -5,7 +5,7 @@ from typing import List
 from datetime import date, datetime, time
 from decimal import Decimal, ROUND_HALF_UP
 
-from src.config import MANAGER_EMAIL
+from src.config import settings
 from src.users.models import User, UserRole
 from src.payouts.models import Payout, Location
 from src.stores.models import StoreVacation
@@ -47,10 +47,10 @@ async def compute_salary(
     return total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP), per_user
 
 async def get_config_manager(session: AsyncSession) -> User | None:
-    if not MANAGER_EMAIL:
+    if not settings.manager_email:
         return None
     q = await session.execute(
-        select(User).where(User.email == MANAGER_EMAIL, User.is_active == True)
+        select(User).where(User.email == settings.manager_email, User.is_active == True)
     )
     return q.scalars().first()
 
@@ -3,7 +3,7 @@ from datetime import date
 import subprocess
 import httpx
 from celery import shared_task
-from src.config import TG_BOT_TOKEN, TG_CHAT_ID, DB_NAME, DB_USER, DB_PASS, DB_HOST
+from src.config import settings
 import hashlib
 
 
@@ -18,7 +18,7 @@ def get_file_hash(path: str) -> str:
 
 @shared_task
 def send_db_backup_task():
-    filename = f"/fastapi_app/tmp/backup_{DB_NAME}.sql"
+    filename = f"/fastapi_app/tmp/backup_{settings.db_name}.sql"
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     hash_path = f"{filename}.sha256"
     old_hash = None
@@ -29,13 +29,13 @@ def send_db_backup_task():
     else:
         old_hash = get_file_hash(filename) if os.path.exists(filename) else None
 
-    print(f"📦 Создание бекапа базы данных {DB_NAME}...")
+    print(f"📦 Создание бекапа базы данных {settings.db_name}...")
 
     try:
         subprocess.run(
-            ["pg_dump", "-h", DB_HOST, "-U", DB_USER, "-d", DB_NAME, "--exclude-table-data=user_logs", "-f", filename],
+            ["pg_dump", "-h", settings.db_host, "-U", settings.db_user, "-d", settings.db_name, "--exclude-table-data=user_logs", "-f", filename],
             check=True,
-            env={**os.environ, "PGPASSWORD": DB_PASS},
+            env={**os.environ, "PGPASSWORD": settings.db_pass},
         )
     except subprocess.CalledProcessError as e:
         print(f"❌ Ошибка при создании дампа: {e}")
@@ -54,8 +54,8 @@ def send_db_backup_task():
     try:
         with open(filename, "rb") as f:
             response = httpx.post(
-                url=f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendDocument",
-                data={"chat_id": TG_CHAT_ID, "caption": f"Бэкап за {date.today()}"},
+                url=f"https://api.telegram.org/bot{settings.tg_bot_token}/sendDocument",
+                data={"chat_id": settings.tg_chat_id, "caption": f"Бэкап за {date.today()}"},
                 files={"document": f}
             )
         if response.status_code == 200:
@@ -5,7 +5,7 @@ from datetime import date, timedelta
 from decimal import Decimal
 
 from celery import shared_task
-from sqlalchemy import select, func
+from sqlalchemy import select, func, true
 from sqlalchemy.orm import selectinload
 
 from src.database import async_session_maker
@@ -27,31 +27,27 @@ async def _send_daily_order_summary():
         # Статистика за вчера
         yesterday = date.today() - timedelta(days=1)
 
-        # Подсчитываем заказы и возвраты за вчера
-        stmt_orders = (
-            select(
-                func.count(Order.id).label("total_count"),
-                func.sum(Order.amount).label("total_amount"),
-            )
-            .where(Order.date == yesterday)
-        )
-        result_orders = await session.execute(stmt_orders)
-        orders_data = result_orders.first()
-
-        stmt_returns = (
-            select(
-                func.count(Return.id).label("total_count"),
-                func.sum(Return.amount).label("total_amount"),
-            )
-            .where(Return.date == yesterday)
-        )
-        result_returns = await session.execute(stmt_returns)
-        returns_data = result_returns.first()
-
-        total_orders = orders_data.total_count or 0
-        total_orders_amount = orders_data.total_amount or Decimal("0")
-        total_returns = returns_data.total_count or 0
-        total_returns_amount = returns_data.total_amount or Decimal("0")
+        # Подсчитываем заказы и возвраты за вчера одним запросом: два однострочных агрегата
+        orders_agg = select(
+            func.count(Order.id).label("total_count"),
+            func.sum(Order.amount).label("total_amount"),
+        ).where(Order.date == yesterday).subquery()
+        returns_agg = select(
+            func.count(Return.id).label("total_count"),
+            func.sum(Return.amount).label("total_amount"),
+        ).where(Return.date == yesterday).subquery()
+        stmt_totals = select(
+            orders_agg.c.total_count.label("orders_count"),
+            orders_agg.c.total_amount.label("orders_amount"),
+            returns_agg.c.total_count.label("returns_count"),
+            returns_agg.c.total_amount.label("returns_amount"),
+        ).select_from(orders_agg.join(returns_agg, true()))
+        totals = (await session.execute(stmt_totals)).one()
+
+        total_orders = totals.orders_count or 0
+        total_orders_amount = totals.orders_amount or Decimal("0")
+        total_returns = totals.returns_count or 0
+        total_returns_amount = totals.returns_amount or Decimal("0")
 
         # Получаем всех админов
         stmt_admins = select(User.id).where(User.role == UserRole.ADMIN, User.is_active == True)
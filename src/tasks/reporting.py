@@ -13,7 +13,7 @@ from celery import shared_task
 from sqlalchemy import select, text as sa_text
 from sqlalchemy.orm import selectinload
 
-from src.config import TG_BOT_TOKEN, TG_CHAT_ID
+from src.config import settings
 from src.database import async_session_maker
 from src.tiktok.reports.service import (
     get_monthly_report,
@@ -472,7 +472,7 @@ async def _send_telegram_messages(texts: Iterable[str]) -> None:
     messages = [text.strip() for text in texts if text.strip()]
     if not messages:
         return
-    if not TG_BOT_TOKEN or not TG_CHAT_ID:
+    if not settings.tg_bot_token or not settings.tg_chat_id:
         for message in messages:
             print("[REPORT]", message)
         return
@@ -481,9 +481,9 @@ async def _send_telegram_messages(texts: Iterable[str]) -> None:
         for message in messages:
             for payload in _split_message(message):
                 resp = await client.post(
-                    f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage",
+                    f"https://api.telegram.org/bot{settings.tg_bot_token}/sendMessage",
                     data={
-                        "chat_id": TG_CHAT_ID,
+                        "chat_id": settings.tg_chat_id,
                         "text": payload,
                         "parse_mode": "HTML",              # офиц. параметр
                         "disable_web_page_preview": True,  # офиц. параметр
@@ -495,7 +495,7 @@ async def _send_telegram_messages(texts: Iterable[str]) -> None:
 async def _send_telegram_document(filename: str, content: str, caption: str | None = None) -> None:
     if not content.strip():
         return
-    if not TG_BOT_TOKEN or not TG_CHAT_ID:
+    if not settings.tg_bot_token or not settings.tg_chat_id:
         print(f"[REPORT_DOC] {filename}\n{content[:1000]}...\n")
         return
 
@@ -506,13 +506,13 @@ async def _send_telegram_document(filename: str, content: str, caption: str | No
             "document": (filename, content.encode("utf-8"), "text/plain"),
         }
         data = {
-            "chat_id": TG_CHAT_ID,
+            "chat_id": settings.tg_chat_id,
         }
         if caption:
             data["caption"] = caption
             data["parse_mode"] = "HTML"
         resp = await client.post(
-            f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendDocument",
+            f"https://api.telegram.org/bot{settings.tg_bot_token}/sendDocument",
             data=data,
             files=files,
         )
@@ -0,0 +1,19 @@
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+JINJA_CACHE_DIR = "tmp/jinja_cache"
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
+# Одно окружение Jinja на всё приложение: шаблоны компилируются один раз,
+# а байткод переживает перезапуск воркеров.
+# cache_size задаётся только в конструкторе: LRU-кеш создаётся в Environment.__init__
+_env = Environment(
+    loader=FileSystemLoader("src/templates"),
+    autoescape=True,
+    auto_reload=False,
+    cache_size=1000,
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+)
+templates = Jinja2Templates(env=_env)
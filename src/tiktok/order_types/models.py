@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, Numeric, String, text
 from sqlalchemy.orm import relationship
 from src.database import Base, metadata
 
@@ -17,7 +17,7 @@ class OrderType(Base):
     default_employee_percent = Column(Numeric(10, 2), nullable=True)
     # Учитывать ли этот тип заказа в расчёте ЗП сотрудников (Employee)
     # True = включать в кассу для сотрудников, False = только для менеджеров
-    include_in_employee_salary = Column(Boolean, default=True, nullable=True)
+    include_in_employee_salary = Column(Boolean, default=True, server_default=text("true"), nullable=True)
 
     # Связь с индивидуальными настройками пользователей
     user_settings = relationship("UserOrderTypeSetting", back_populates="order_type", cascade="all, delete-orphan")
@@ -27,9 +27,13 @@ class UserOrderTypeSetting(Base):
     """Индивидуальные настройки типа заказа для конкретного пользователя"""
 
     __tablename__ = "user_order_type_settings"
+    # Один индекс и на выборку всех настроек пользователя, и на пару (user, type)
+    __table_args__ = (
+        Index("ix_user_order_type_settings_user_id_order_type_id", "user_id", "order_type_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     order_type_id = Column(Integer, ForeignKey("order_types.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Индивидуальный процент для этого пользователя и типа заказа
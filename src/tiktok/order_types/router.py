@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
@@ -10,13 +9,14 @@ from src.auth.dependencies import get_admin_user, get_manager_or_admin
 from src.database import get_async_session
 from src.users.models import User, UserRole
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
 from src.utils.query_params import optional_date
 from src.tiktok.orders.models import Order
 from src.tiktok.order_types.models import OrderType, UserOrderTypeSetting
 from src.tiktok.order_types.schemas import OrderTypeCreate, OrderTypeUpdate
+from src.tiktok.reports.cache import bump_reports_version
 
 router = APIRouter(prefix="/order-types", tags=["Order Types"])
-templates = Jinja2Templates(directory="src/templates")
 
 
 @router.get("/", response_class=HTMLResponse, dependencies=[Depends(get_manager_or_admin)])
@@ -222,6 +222,7 @@ async def create_order_type(
 
     session.add(order_type)
     await session.commit()
+    await bump_reports_version()
 
     return RedirectResponse("/order-types/", status_code=302)
 
@@ -293,6 +294,7 @@ async def edit_order_type(
     order_type.is_active = is_active
 
     await session.commit()
+    await bump_reports_version()
 
     return RedirectResponse("/order-types/", status_code=302)
 
@@ -324,6 +326,7 @@ async def delete_order_type(
     # Пока просто помечаем как неактивный
     order_type.is_active = False
     await session.commit()
+    await bump_reports_version()
 
     return RedirectResponse("/order-types/", status_code=302)
 
@@ -420,6 +423,12 @@ async def update_order_type_settings(
 
     # Обновляем индивидуальные настройки для каждого пользователя
     # Формат: user_{user_id}_percent, user_{user_id}_allowed
+    # Все настройки этого типа заказа одним запросом
+    settings_result = await session.execute(
+        select(UserOrderTypeSetting).where(UserOrderTypeSetting.order_type_id == order_type_id)
+    )
+    settings_by_user = {s.user_id: s for s in settings_result.scalars().all()}
+
     processed_user_ids = set()
     for key in form_data.keys():
         if key.startswith("user_") and key.endswith("_percent"):
@@ -429,13 +438,7 @@ async def update_order_type_settings(
             custom_percent_str = form_data.get(f"user_{user_id}_percent", "").strip()
             is_allowed = form_data.get(f"user_{user_id}_allowed") == "on"
 
-            # Получаем или создаём настройку
-            setting_stmt = select(UserOrderTypeSetting).where(
-                UserOrderTypeSetting.user_id == user_id,
-                UserOrderTypeSetting.order_type_id == order_type_id
-            )
-            setting_result = await session.execute(setting_stmt)
-            setting = setting_result.scalar_one_or_none()
+            setting = settings_by_user.get(user_id)
 
             # Определяем нужно ли создавать/обновлять/удалять настройку
             custom_percent = Decimal(custom_percent_str) if custom_percent_str else None
@@ -460,5 +463,6 @@ async def update_order_type_settings(
                 await session.delete(setting)
 
     await session.commit()
+    await bump_reports_version()
 
     return RedirectResponse(f"/order-types/{order_type_id}/settings?success=1", status_code=302)
@@ -33,6 +33,6 @@ class Order(Base):
     created_by = Column(ForeignKey("users.id"))
     type_id = Column(ForeignKey("order_types.id"), nullable=True)  # Оставляем для обратной совместимости
 
-    created_by_user = relationship("User", backref="orders", lazy="joined")
+    created_by_user = relationship("User", backref="orders", lazy="raise")  # Грузим явно там, где нужен (списки)
     order_type = relationship("OrderType", foreign_keys=[type_id], lazy="joined")  # Старая схема
     order_order_types = relationship("OrderOrderType", back_populates="order", lazy="selectin", cascade="all, delete-orphan")  # Новая схема - selectin избегает дубликатов
@@ -1,10 +1,9 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, delete, extract, insert, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, delete, exists, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -15,9 +14,13 @@ from src.tiktok.orders.models import Order, OrderOrderType
 from src.tiktok.order_types.models import OrderType, UserOrderTypeSetting
 from src.users.models import User, UserRole
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
+from src.utils.query_params import day_filter
+from src.tiktok.reports.cache import bump_reports_version
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
+# Шаблон списка заказов разрешаем один раз при импорте, рендер синхронный
+ORDERS_LIST_TPL = templates.get_template("tiktok/orders/list.html")
 
 @router.get("/create", response_class=HTMLResponse)
 async def create_order_page(
@@ -159,31 +162,39 @@ async def create_order(
             "form_data": dict(form_data),  # Передаем все данные формы для повтора
         })
 
-    # 🔹 Создание заказа
-    new_order = Order(
-        phone_number=phone_number,
-        date=date_,
-        amount=amount,
-        type_id=None,  # Новые заказы не используют старую схему
-        created_by=user.id
+    # 🔹 Создание заказа: INSERT в CTE и проверка смены за эту дату одним запросом
+    ins = (
+        insert(Order)
+        .values(
+            phone_number=phone_number,
+            date=date_,
+            amount=amount,
+            type_id=None,  # Новые заказы не используют старую схему
+            created_by=user.id,
+            # Внутри CTE Python-значение по умолчанию не подставляется — время задаём явно
+            created_at=datetime.now(),
+        )
+        .returning(Order.id, Order.date)
+        .cte("ins")
+    )
+    result = await session.execute(
+        select(ins.c.id, exists().where(Shift.date == ins.c.date).label("has_shift"))
     )
-    session.add(new_order)
-    await session.flush()  # Получаем ID заказа
+    order_id, has_shift = result.one()
 
     # Создаем связи с типами
-    for item in order_types_data:
-        order_order_type = OrderOrderType(
-            order_id=new_order.id,
-            order_type_id=item["type_id"],
-            amount=item["amount"]
-        )
-        session.add(order_order_type)
+    await session.execute(
+        insert(OrderOrderType),
+        [
+            {"order_id": order_id, "order_type_id": item["type_id"], "amount": item["amount"]}
+            for item in order_types_data
+        ],
+    )
 
     await session.commit()
+    await bump_reports_version()
 
-    result = await session.execute(select(Shift).where(Shift.date == date_))
-    shift = result.scalar_one_or_none()
-    if not shift:
+    if not has_shift:
         return RedirectResponse(f"/shifts/create?date={date_.isoformat()}", status_code=302)
 
     response = RedirectResponse("/dashboard?success=1", status_code=302)
@@ -193,31 +204,36 @@ async def create_order(
 @router.get("/all/list", response_class=HTMLResponse)
 async def list_orders_all(
     request: Request,
-    day: Optional[int] = Query(date.today().day),
-    month: Optional[int] = Query(date.today().month),
-    year: Optional[int] = Query(date.today().year),
+    day: Optional[int] = Query(None),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     type_id: Optional[str] = Query(None),
     sort_by: str = Query("date_desc"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user),
 ):
+    today = date.today()
+    day = day or today.day
+    month = month or today.month
+    year = year or today.year
+
     # Конвертируем type_id из строки в int (пустая строка -> None)
     type_id_int = int(type_id) if type_id else None
 
     filters = [
-        extract("day", Order.date) == day,
-        extract("month", Order.date) == month,
-        extract("year", Order.date) == year
+        day_filter(Order.date, year, month, day),
     ]
 
     # Фильтр по типу заказа
     if type_id_int is not None:
         filters.append(Order.type_id == type_id_int)
 
+    # selectinload: связи подтягиваются отдельными IN-запросами, строки заказа
+    # не размножаются JOIN-ом по типам
     stmt = select(Order).where(and_(*filters)).options(
-        joinedload(Order.created_by_user),
-        joinedload(Order.order_type),
-        joinedload(Order.order_order_types).joinedload(OrderOrderType.order_type)
+        selectinload(Order.created_by_user),
+        selectinload(Order.order_type),
+        selectinload(Order.order_order_types).selectinload(OrderOrderType.order_type)
     ).execution_options(populate_existing=True)
 
     # Применяем сортировку
@@ -237,38 +253,43 @@ async def list_orders_all(
         stmt = stmt.order_by(Order.date.desc())
 
     result = await session.execute(stmt)
-    orders = result.unique().scalars().all()
+    orders = result.scalars().all()
 
     # Загружаем все типы заказов для фильтра
     types_stmt = select(OrderType).where(OrderType.is_active == True).order_by(OrderType.name)
     types_result = await session.execute(types_stmt)
     order_types = types_result.scalars().all()
 
-    return templates.TemplateResponse("tiktok/orders/list.html", {
-        "request": request,
-        "orders": orders,
-        "user": user,
-        "day": day,
-        "month": month,
-        "year": year,
-        "type_id": type_id_int,
-        "sort_by": sort_by,
-        "order_types": order_types,
-    })
+    return HTMLResponse(ORDERS_LIST_TPL.render(
+        request=request,
+        orders=orders,
+        user=user,
+        day=day,
+        month=month,
+        year=year,
+        type_id=type_id_int,
+        sort_by=sort_by,
+        order_types=order_types,
+    ))
 
 
 @router.get("/{id}/list", response_class=HTMLResponse)
 async def list_orders_user(
     id: int,
     request: Request,
-    day: Optional[int] = Query(date.today().day),
-    month: Optional[int] = Query(date.today().month),
-    year: Optional[int] = Query(date.today().year),
+    day: Optional[int] = Query(None),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     type_id: Optional[str] = Query(None),
     sort_by: str = Query("date_desc"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_manager_or_admin),
 ):
+    today = date.today()
+    day = day or today.day
+    month = month or today.month
+    year = year or today.year
+
     if user.id != id and user.role != "admin":
         raise HTTPException(status_code=403, detail="Нет доступа к чужим заказам")
 
@@ -277,19 +298,19 @@ async def list_orders_user(
 
     filters = [
         Order.created_by == id,
-        extract("day", Order.date) == day,
-        extract("month", Order.date) == month,
-        extract("year", Order.date) == year
+        day_filter(Order.date, year, month, day),
     ]
 
     # Фильтр по типу заказа
     if type_id_int is not None:
         filters.append(Order.type_id == type_id_int)
 
+    # selectinload: связи подтягиваются отдельными IN-запросами, строки заказа
+    # не размножаются JOIN-ом по типам
     stmt = select(Order).where(and_(*filters)).options(
-        joinedload(Order.created_by_user),
-        joinedload(Order.order_type),
-        joinedload(Order.order_order_types).joinedload(OrderOrderType.order_type)
+        selectinload(Order.created_by_user),
+        selectinload(Order.order_type),
+        selectinload(Order.order_order_types).selectinload(OrderOrderType.order_type)
     ).execution_options(populate_existing=True)
 
     # Применяем сортировку
@@ -309,24 +330,24 @@ async def list_orders_user(
         stmt = stmt.order_by(Order.date.desc())
 
     result = await session.execute(stmt)
-    orders = result.unique().scalars().all()
+    orders = result.scalars().all()
 
     # Загружаем все типы заказов для фильтра
     types_stmt = select(OrderType).where(OrderType.is_active == True).order_by(OrderType.name)
     types_result = await session.execute(types_stmt)
     order_types = types_result.scalars().all()
 
-    return templates.TemplateResponse("tiktok/orders/list.html", {
-        "request": request,
-        "orders": orders,
-        "user": user,
-        "day": day,
-        "month": month,
-        "year": year,
-        "type_id": type_id_int,
-        "sort_by": sort_by,
-        "order_types": order_types,
-    })
+    return HTMLResponse(ORDERS_LIST_TPL.render(
+        request=request,
+        orders=orders,
+        user=user,
+        day=day,
+        month=month,
+        year=year,
+        type_id=type_id_int,
+        sort_by=sort_by,
+        order_types=order_types,
+    ))
 
 
 @router.get("/{order_id}/edit", response_class=HTMLResponse)
@@ -453,40 +474,32 @@ async def update_order(
     if user.role != "admin" and abs((date.today() - date_).days) > 14:
         raise HTTPException(status_code=400, detail="Дата заказа должна быть в пределах 14 дней от сегодняшней")
 
-    # Загружаем заказ с текущими типами
-    stmt = select(Order).where(Order.id == order_id).options(
-        joinedload(Order.order_order_types)
+    # Обновляем основные поля одним UPDATE, без предварительной загрузки заказа
+    # МИГРАЦИЯ: обнуляем type_id (переходим на новую схему)
+    result = await session.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(phone_number=phone_number, date=date_, amount=amount, type_id=None)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
     )
-    result = await session.execute(stmt)
-    order = result.unique().scalars().first()
-
-    if not order:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Заказ не найден")
 
-    # Обновляем основные поля
-    order.phone_number = phone_number
-    order.date = date_
-    order.amount = amount
-
-    # МИГРАЦИЯ: обнуляем type_id (переходим на новую схему)
-    order.type_id = None
-
-    # Удаляем старые связи с типами
-    for old_type in list(order.order_order_types):
-        await session.delete(old_type)
-
-    await session.flush()
-
-    # Создаем новые связи с типами
-    for item in order_types_data:
-        order_order_type = OrderOrderType(
-            order_id=order.id,
-            order_type_id=item["type_id"],
-            amount=item["amount"]
-        )
-        session.add(order_order_type)
+    # Заменяем связи с типами
+    await session.execute(
+        delete(OrderOrderType).where(OrderOrderType.order_id == order_id)
+    )
+    await session.execute(
+        insert(OrderOrderType),
+        [
+            {"order_id": order_id, "order_type_id": item["type_id"], "amount": item["amount"]}
+            for item in order_types_data
+        ],
+    )
 
     await session.commit()
+    await bump_reports_version()
 
     if user.role == "admin":
         return RedirectResponse(url="/orders/all/list", status_code=302)
@@ -501,8 +514,13 @@ async def delete_order(
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user),
 ):
-    await session.execute(delete(Order).where(Order.id == order_id))
+    result = await session.execute(
+        delete(Order).where(Order.id == order_id).returning(Order.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Заказ не найден")
     await session.commit()
+    await bump_reports_version()
     if user.role == "admin":
         return RedirectResponse("/orders/all/list", status_code=302)
     return RedirectResponse(f"/orders/{user.id}/list", status_code=302)
@@ -0,0 +1,74 @@
+import json
+from datetime import date, time
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import redis_client
+from src.tiktok.reports.service import get_monthly_report
+from src.users.models import UserRole
+
+# Версия данных отчётов: увеличивается при любой записи, влияющей на отчёт
+# (заказы, возвраты, смены, типы заказов, пользователи), и тем самым
+# делает недействительными все ранее сохранённые отчёты
+REPORTS_VERSION_KEY = "reports:version"
+REPORT_CACHE_TTL = 300  # 5 минут
+# Меняется при изменении структуры отчёта, чтобы не отдавать старые записи из кеша
+REPORT_CACHE_SCHEMA = 3
+
+
+def _to_json(obj):
+    """Отчёт -> JSON-совместимая структура с явными тегами для Decimal, date и time.
+
+    Словари с нестроковыми ключами (id пользователей) хранятся списком пар,
+    чтобы ключи не превратились в строки.
+    """
+    if isinstance(obj, Decimal):
+        return {"__decimal__": str(obj)}
+    if isinstance(obj, date):
+        return {"__date__": obj.isoformat()}
+    if isinstance(obj, time):
+        return {"__time__": obj.isoformat()}
+    if isinstance(obj, dict):
+        if all(isinstance(key, str) for key in obj):
+            return {key: _to_json(value) for key, value in obj.items()}
+        return {"__dict__": [[_to_json(key), _to_json(value)] for key, value in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json(value) for value in obj]
+    return obj
+
+
+def _from_json(obj: dict):
+    if "__decimal__" in obj:
+        return Decimal(obj["__decimal__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    if "__time__" in obj:
+        return time.fromisoformat(obj["__time__"])
+    if "__dict__" in obj:
+        return {key: value for key, value in obj["__dict__"]}
+    return obj
+
+
+async def bump_reports_version():
+    await redis_client.incr(REPORTS_VERSION_KEY)
+
+
+async def get_monthly_report_cached(session: AsyncSession, start: date, end: date, current_user):
+    """get_monthly_report с кешем в Redis.
+
+    Результат зависит только от периода, версии данных и того, менеджер ли
+    смотрит отчёт (менеджеру скрываются админы и статистика по типам).
+    Используется только в веб-приложении: celery-задачи считают отчёт напрямую.
+    """
+    version = await redis_client.get(REPORTS_VERSION_KEY) or "0"
+    audience = "manager" if current_user.role == UserRole.MANAGER else "full"
+    key = f"monthly:v{REPORT_CACHE_SCHEMA}:{version}:{audience}:{start.isoformat()}:{end.isoformat()}"
+
+    cached = await redis_client.get(key)
+    if cached is not None:
+        return json.loads(cached, object_hook=_from_json)
+
+    report = await get_monthly_report(session, start, end, current_user=current_user)
+    await redis_client.set(key, json.dumps(_to_json(report)), ex=REPORT_CACHE_TTL)
+    return report
@@ -1,7 +1,6 @@
 from decimal import Decimal
 from fastapi import APIRouter, Form, HTTPException, Request, Depends, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from datetime import date, datetime, timedelta
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,15 +9,34 @@ from src.payouts.models import Payout, RoleType
 from src.tiktok.shifts.models import Shift
 from src.database import get_async_session
 from src.auth.dependencies import get_admin_user, get_manager_or_admin
-from src.tiktok.reports.service import get_half_month_periods, get_weekly_periods, get_monthly_report, get_payouts_for_period, summarize_period
+from src.tiktok.reports.cache import get_monthly_report_cached
+from src.tiktok.reports.service import get_half_month_periods, get_weekly_periods, get_payouts_for_period, summarize_period
 from src.users.models import User
+from src.users.service import get_user_map
 from src.payouts.models import Location
 from src.utils.query_params import optional_date
 
 from src.tasks.reporting import _build_period_for_today, _generate_and_send_reports
+from src.templates_env import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
+
+
+async def _month_by_periods(session: AsyncSession, periods, current_user):
+    """Отчёт и выплаты для подряд идущих периодов месяца.
+
+    Отчёт строится один раз за весь диапазон (дни считаются независимо) и
+    делится по датам в Python; всё выполняется в сессии запроса, без
+    дополнительных соединений из пула.
+    """
+    days = await get_monthly_report_cached(session, periods[0][0], periods[-1][1], current_user=current_user)
+    result = []
+    for start, end in periods:
+        period_days = [day for day in days if start <= day["date"] <= end]
+        payouts = await get_payouts_for_period(session, start, end, current_user=current_user)
+        result.append(summarize_period(period_days, payouts))
+    return result
+
 
 @router.get("/monthly", response_class=HTMLResponse)
 async def monthly_report_page(
@@ -46,10 +64,7 @@ async def monthly_report_page(
         month = target.month
         year = target.year
 
-    users_q = await session.execute(select(User))
-    users = users_q.scalars().all()
-
-    user_map = {u.id: u.name for u in users}
+    user_map = await get_user_map(session)
 
     # Выбор логики периодов
     if period_mode == "custom":
@@ -60,7 +75,7 @@ async def monthly_report_page(
         elif custom_start_date > custom_end_date:
             raise HTTPException(status_code=400, detail="Дата начала не может быть позже даты окончания")
         else:
-            data_custom = await get_monthly_report(session, custom_start_date, custom_end_date, current_user=user)
+            data_custom = await get_monthly_report_cached(session, custom_start_date, custom_end_date, current_user=user)
             payouts_custom = await get_payouts_for_period(session, custom_start_date, custom_end_date, current_user=user)
             custom_summary = summarize_period(data_custom, payouts_custom)
 
@@ -84,14 +99,9 @@ async def monthly_report_page(
         # Старая логика: 1-15, 16-конец
         first_half, second_half = get_half_month_periods(month, year)
 
-        data_1_15 = await get_monthly_report(session, first_half[0], first_half[1], current_user=user)
-        data_16_31 = await get_monthly_report(session, second_half[0], second_half[1], current_user=user)
-
-        payouts_1_15 = await get_payouts_for_period(session, first_half[0], first_half[1], current_user=user)
-        payouts_16_31 = await get_payouts_for_period(session, second_half[0], second_half[1], current_user=user)
-
-        first_half_summary = summarize_period(data_1_15, payouts_1_15)
-        second_half_summary = summarize_period(data_16_31, payouts_16_31)
+        first_half_summary, second_half_summary = await _month_by_periods(
+            session, (first_half, second_half), user
+        )
 
         periods = [
             ("1–15", first_half_summary, first_half),
@@ -101,20 +111,9 @@ async def monthly_report_page(
         # Новая логика: 1-7, 8-14, 15-21, 22-конец
         period1, period2, period3, period4 = get_weekly_periods(month, year)
 
-        data_1_7 = await get_monthly_report(session, period1[0], period1[1], current_user=user)
-        data_8_14 = await get_monthly_report(session, period2[0], period2[1], current_user=user)
-        data_15_21 = await get_monthly_report(session, period3[0], period3[1], current_user=user)
-        data_22_end = await get_monthly_report(session, period4[0], period4[1], current_user=user)
-
-        payouts_1_7 = await get_payouts_for_period(session, period1[0], period1[1], current_user=user)
-        payouts_8_14 = await get_payouts_for_period(session, period2[0], period2[1], current_user=user)
-        payouts_15_21 = await get_payouts_for_period(session, period3[0], period3[1], current_user=user)
-        payouts_22_end = await get_payouts_for_period(session, period4[0], period4[1], current_user=user)
-
-        period1_summary = summarize_period(data_1_7, payouts_1_7)
-        period2_summary = summarize_period(data_8_14, payouts_8_14)
-        period3_summary = summarize_period(data_15_21, payouts_15_21)
-        period4_summary = summarize_period(data_22_end, payouts_22_end)
+        period1_summary, period2_summary, period3_summary, period4_summary = await _month_by_periods(
+            session, (period1, period2, period3, period4), user
+        )
 
         periods = [
             ("1–7", period1_summary, period1),
@@ -1,9 +1,11 @@
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import exists, func, or_, select, union_all
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -43,6 +45,8 @@ def get_employee_percent_for_order_type(
     return user.default_percent
 
 
+# Периоды зависят только от (month, year) и возвращаются кортежами - их безопасно кешировать
+@lru_cache(maxsize=256)
 def get_half_month_periods(month: int, year: int):
     """Старая логика (для совместимости): 1-15, 16-конец месяца"""
     first_half = (date(year, month, 1), date(year, month, 15))
@@ -54,6 +58,7 @@ def get_half_month_periods(month: int, year: int):
     return first_half, second_half
 
 
+@lru_cache(maxsize=256)
 def get_weekly_periods(month: int, year: int):
     """Новая логика: 1-7, 8-14, 15-21, 22-последний день месяца"""
     # Определяем последний день месяца
@@ -70,6 +75,52 @@ def get_weekly_periods(month: int, year: int):
     return period1, period2, period3, period4
 
 
+# Общая пустая заглушка для дней без данных вместо нового dict на каждый день
+_EMPTY = MappingProxyType({})
+
+
+async def _fetch_all(session: AsyncSession, stmt):
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+
+async def _fetch_rows(session: AsyncSession, stmt):
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def _employee_orders_by_date(session: AsyncSession, start: date, end: date) -> dict[date, Decimal]:
+    """Сумма заказов, входящих в кассу сотрудников, по дням - одним GROUP BY в БД.
+
+    Новая схема: суммы связей, тип которых отсутствует или include_in_employee_salary.
+    Старая схема (заказ без связей): сумма заказа, если type_id не указывает на тип
+    с выключенным include_in_employee_salary.
+    """
+    in_salary = or_(OrderType.id.is_(None), OrderType.include_in_employee_salary.is_(True))
+
+    by_links = (
+        select(Order.date.label("date"), OrderOrderType.amount.label("amount"))
+        .join(OrderOrderType, OrderOrderType.order_id == Order.id)
+        .outerjoin(OrderType, OrderType.id == OrderOrderType.order_type_id)
+        .where(Order.date >= start, Order.date <= end, in_salary)
+    )
+    legacy = (
+        select(Order.date.label("date"), Order.amount.label("amount"))
+        .outerjoin(OrderType, OrderType.id == Order.type_id)
+        .where(
+            Order.date >= start,
+            Order.date <= end,
+            ~exists().where(OrderOrderType.order_id == Order.id),
+            in_salary,
+        )
+    )
+    amounts = union_all(by_links, legacy).subquery()
+    stmt = select(amounts.c.date, func.sum(amounts.c.amount)).group_by(amounts.c.date)
+
+    result = await session.execute(stmt)
+    return dict(result.all())
+
+
 async def get_monthly_report(
     session: AsyncSession,
     start: date,
@@ -77,11 +128,8 @@ async def get_monthly_report(
     current_user: User
 ):
 
-    users_q = await session.execute(select(User))
-    users = {u.id: u for u in users_q.scalars().all()}
-
     # Загружаем все заказы с типами для учета комиссии (поддержка обеих схем)
-    orders_q = await session.execute(
+    orders_stmt = (
         select(Order)
         .where(Order.date >= start, Order.date <= end)
         .options(
@@ -89,17 +137,59 @@ async def get_monthly_report(
             selectinload(Order.order_order_types).selectinload(OrderOrderType.order_type)  # Новая схема (many-to-many)
         )
     )
-    all_orders = orders_q.unique().scalars().all()
 
-    # Загружаем все типы заказов для справочника
-    types_q = await session.execute(select(OrderType))
-    order_types = {t.id: t for t in types_q.scalars().all()}
+    # Загружаем возвраты с штрафами и связанными заказами (с типами)
+    returns_stmt = (
+        select(Return)
+        .where(Return.date >= start, Return.date <= end)
+        .options(
+            selectinload(Return.order).selectinload(Order.order_order_types).selectinload(OrderOrderType.order_type),
+            selectinload(Return.order).selectinload(Order.order_type)
+        )
+    )
+
+    # Смены с назначениями: только нужные колонки, без ORM-объектов смен и пользователей
+    shifts_stmt = (
+        select(
+            Shift.id,
+            Shift.date,
+            Shift.location,
+            ShiftAssignment.user_id,
+            ShiftAssignment.salary,
+            ShiftAssignment.start_time,
+            ShiftAssignment.end_time,
+            User.role,
+            User.default_percent,
+        )
+        .outerjoin(ShiftAssignment, ShiftAssignment.shift_id == Shift.id)
+        .outerjoin(User, User.id == ShiftAssignment.user_id)
+        .where(Shift.date >= start, Shift.date <= end)
+        .order_by(Shift.date, Shift.id, ShiftAssignment.id)
+    )
 
-    # Загружаем индивидуальные настройки типов заказов для пользователей
-    settings_q = await session.execute(select(UserOrderTypeSetting))
+    # Все запросы идут последовательно в сессии вызывающего: отчёт не занимает
+    # дополнительные соединения пула и читает данные в одной транзакции
+    # Только поля, нужные расчёту: строки вместо ORM-объектов User
+    all_users = await _fetch_rows(
+        session,
+        select(User.id, User.name, User.role, User.default_rate, User.default_percent),
+    )
+    all_orders = await _fetch_all(session, orders_stmt)
+    all_types = await _fetch_all(session, select(OrderType))
+    all_settings = await _fetch_all(session, select(UserOrderTypeSetting))
+    all_returns = await _fetch_all(session, returns_stmt)
+    all_shifts = await _fetch_rows(session, shifts_stmt)
+    employee_totals = await _employee_orders_by_date(session, start, end)
+
+    users = {u.id: u for u in all_users}
+
+    # Справочник типов заказов
+    order_types = {t.id: t for t in all_types}
+
+    # Индивидуальные настройки типов заказов для пользователей
     user_settings_map = {
         (s.user_id, s.order_type_id): s
-        for s in settings_q.scalars().all()
+        for s in all_settings
     }
 
     # Группируем заказы по дате и создателю
@@ -108,17 +198,6 @@ async def get_monthly_report(
         orders_map[order.date][order.created_by]['amount'] += order.amount
         orders_map[order.date][order.created_by]['orders'].append(order)
 
-    # Загружаем возвраты с штрафами и связанными заказами (с типами)
-    returns_q = await session.execute(
-        select(Return)
-        .where(Return.date >= start, Return.date <= end)
-        .options(
-            selectinload(Return.order).selectinload(Order.order_order_types).selectinload(OrderOrderType.order_type),
-            selectinload(Return.order).selectinload(Order.order_type)
-        )
-    )
-    all_returns = returns_q.scalars().all()
-
     # Группируем возвраты по дате
     returns_map = defaultdict(Decimal)
     returns_details_map = defaultdict(list)  # Детали возвратов для отображения
@@ -171,51 +250,35 @@ async def get_monthly_report(
             for user_id_str, penalty_amount in ret.penalty_distribution.items():
                 penalties_map_by_date[ret.date][int(user_id_str)] += Decimal(str(penalty_amount))
 
-    # Все смены с назначениями
-    shifts_q = await session.execute(
-        select(Shift)
-        .where(Shift.date >= start, Shift.date <= end)
-        .options(selectinload(Shift.assignments).selectinload(ShiftAssignment.user))
-    )
-    shifts_by_date = defaultdict(list)
-    for shift in shifts_q.scalars().all():
-        shifts_by_date[shift.date].append(shift)
+    # {date: {shift_id: {"id", "location", "assignments": [строки назначений]}}}
+    shifts_by_date = defaultdict(dict)
+    for row in all_shifts:
+        day_shifts = shifts_by_date[row.date]
+        shift = day_shifts.get(row.id)
+        if shift is None:
+            shift = day_shifts[row.id] = {"id": row.id, "location": row.location, "assignments": []}
+        if row.user_id is not None:
+            shift["assignments"].append(row)
 
     # Единый проход по дням
     result = []
-    current = start
+    all_dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    # Роль смотрящего не меняется по дням - проверяем один раз
+    is_manager_view = current_user.role == UserRole.MANAGER
 
-    while current <= end:
-        shifts = shifts_by_date.get(current, [])
-        day_orders = orders_map.get(current, {})
+    for current in all_dates:
+        shifts = list(shifts_by_date.get(current, _EMPTY).values())
+        day_orders = orders_map.get(current, _EMPTY)
         returns = returns_map.get(current, Decimal("0.00"))
         total_orders = sum(order_data['amount'] for order_data in day_orders.values())
         cashbox = total_orders - returns
 
-        # Рассчитываем кассу для сотрудников (только типы с include_in_employee_salary=True)
-        employee_orders_total = Decimal('0')
-        for uid, order_data in day_orders.items():
-            for order in order_data['orders']:
-                # НОВАЯ СХЕМА: несколько типов
-                if order.order_order_types:
-                    for order_type_link in order.order_order_types:
-                        ot = order_type_link.order_type
-                        # Включаем только если include_in_employee_salary=True (или если типа нет)
-                        if ot is None or ot.include_in_employee_salary:
-                            employee_orders_total += order_type_link.amount
-                # СТАРАЯ СХЕМА: один тип
-                elif order.type_id and order.type_id in order_types:
-                    ot = order_types[order.type_id]
-                    if ot.include_in_employee_salary:
-                        employee_orders_total += order.amount
-                # БЕЗ ТИПА — включаем (обратная совместимость)
-                else:
-                    employee_orders_total += order.amount
-        employee_cashbox = employee_orders_total - returns
+        # Касса для сотрудников (только типы с include_in_employee_salary=True), посчитана в БД
+        employee_cashbox = employee_totals.get(current, Decimal('0')) - returns
 
         # Статистика по типам заказов (только для админов, менеджеры не видят)
         orders_by_type = defaultdict(lambda: {'amount': Decimal('0'), 'count': 0})
-        if current_user.role != UserRole.MANAGER:
+        if not is_manager_view:
             for uid, order_data in day_orders.items():
                 for order in order_data['orders']:
                     # НОВАЯ СХЕМА: несколько типов
@@ -238,30 +301,17 @@ async def get_monthly_report(
         fixed = defaultdict(Decimal)
         percent = defaultdict(Decimal)
         employee_details = []
-        shift_id = shifts[0].id if shifts else None
+        shift_id = shifts[0]["id"] if shifts else None
 
         # Сотрудники по сменам
         for shift in shifts:
-            assignments = [a for a in shift.assignments if a.user.role == UserRole.EMPLOYEE]
+            assignments = [a for a in shift["assignments"] if a.role == UserRole.EMPLOYEE]
             
             if not assignments:
                 continue
 
-            if shift.location == Location.TikTok:
-                ratios = {}
-                total_ratio = Decimal("0")
+            if shift["location"] == Location.TikTok:
                 for a in assignments:
-                    def_hours = (
-                        datetime.combine(date.today(), a.user.shift_end)
-                        - datetime.combine(date.today(), a.user.shift_start)
-                    ).total_seconds() / 3600 or 1
-                    work_hours = (
-                        datetime.combine(date.today(), a.end_time)
-                        - datetime.combine(date.today(), a.start_time)
-                    ).total_seconds() / 3600
-                    ratio = Decimal(work_hours) / Decimal(def_hours)
-                    ratios[a.user_id] = ratio
-                    total_ratio += ratio
                     fixed[a.user_id] += Decimal(a.salary)
                     employee_details.append(
                         {
@@ -269,13 +319,14 @@ async def get_monthly_report(
                             "start_time": a.start_time,
                             "end_time": a.end_time,
                             "salary": a.salary,
+                            "salary_fmt": "%.0f" % a.salary,
                         }
                     )
 
+                # Используем employee_cashbox (только типы с include_in_employee_salary=True)
+                cashbox_perc = employee_cashbox / len(employee_details) if employee_details else Decimal('0')
                 for a in assignments:
-                    # Используем employee_cashbox (только типы с include_in_employee_salary=True)
-                    cashbox_perc = employee_cashbox / len(employee_details) if employee_details else Decimal('0')
-                    percent[a.user_id] += round((cashbox_perc * a.user.default_percent) / 100)
+                    percent[a.user_id] += round((cashbox_perc * a.default_percent) / 100)
             else:
                 for a in assignments:
                     fixed[a.user_id] += Decimal(a.salary)
@@ -285,6 +336,7 @@ async def get_monthly_report(
                             "start_time": a.start_time,
                             "end_time": a.end_time,
                             "salary": a.salary,
+                            "salary_fmt": "%.0f" % a.salary,
                         }
                     )
 
@@ -297,7 +349,7 @@ async def get_monthly_report(
                 day_managers.append(uid)
 
         # Получаем возвраты за день
-        day_returns_by_manager = returns_by_manager.get(current, {})
+        day_returns_by_manager = returns_by_manager.get(current, _EMPTY)
         day_returns_unassigned = returns_unassigned.get(current, Decimal('0'))
 
         # Равномерная доля нераспределённых возвратов на каждого менеджера
@@ -351,7 +403,7 @@ async def get_monthly_report(
         # Статистика по создателям (менеджерам)
         # Для MANAGER этот блок скрываем полностью (таблица "💼 Касса по менеджерам" не отображается).
         orders_by_creator = {}
-        if current_user.role != UserRole.MANAGER:
+        if not is_manager_view:
             for uid, order_data in day_orders.items():
                 user = users.get(uid)
                 if user:
@@ -370,10 +422,11 @@ async def get_monthly_report(
         salary_percent_by_user = {}
         penalties_by_user = {}
 
-        day_penalties = penalties_map_by_date.get(current, {})
+        day_penalties = penalties_map_by_date.get(current, _EMPTY)
 
-        for uid in set(fixed) | set(percent) | set(day_penalties):
-            if current_user.role == UserRole.MANAGER and users.get(uid) and users.get(uid).role == UserRole.ADMIN:
+        # Объединение представлений ключей: один итоговый set без промежуточных копий
+        for uid in fixed.keys() | percent.keys() | day_penalties.keys():
+            if is_manager_view and users.get(uid) and users.get(uid).role == UserRole.ADMIN:
                 continue
 
             # Вычитаем штрафы из зарплаты
@@ -391,6 +444,11 @@ async def get_monthly_report(
             "returns": returns,
             "returns_details": returns_details_map.get(current, []),  # Детали возвратов с типами заказов
             "cashbox": cashbox,
+            # Готовые строки для шаблона: форматирование делается один раз при сборке
+            # отчёта (и попадает в кеш), а не в каждой ячейке при рендере
+            "orders_fmt": "%.2f" % total_orders,
+            "returns_fmt": "%.2f" % returns,
+            "cashbox_fmt": "%.2f" % cashbox,
             "salary_by_user": salary_by_user,
             "salary_fixed_by_user": salary_fixed_by_user,
             "salary_percent_by_user": salary_percent_by_user,
@@ -402,8 +460,6 @@ async def get_monthly_report(
             "orders_by_creator": orders_by_creator,
         })
 
-        current += timedelta(days=1)
-
     return result
 
 
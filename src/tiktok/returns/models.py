@@ -20,5 +20,5 @@ class Return(Base):
     penalty_amount = Column(Numeric(10, 2), default=0.0, server_default='0.0', nullable=False)  # Сумма штрафа
     penalty_distribution = Column(JSONB, default=dict, server_default='{}', nullable=False)  # {user_id: amount}
 
-    created_by_user = relationship("User", backref="returnings", lazy="joined")
+    created_by_user = relationship("User", backref="returnings", lazy="raise")  # Грузим явно в списках
     order = relationship("Order", backref="returns", lazy="joined")
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, Form, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-from sqlalchemy import insert, select, delete, extract, and_
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy import insert, select, delete, and_
 from datetime import date, timedelta
 from decimal import ROUND_CEILING, Decimal
 from typing import List, Optional
@@ -14,9 +13,11 @@ from src.tiktok.returns.models import Return
 from src.tiktok.orders.models import Order
 from src.users.models import User, UserRole
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
+from src.utils.query_params import day_filter
+from src.tiktok.reports.cache import bump_reports_version
 
 router = APIRouter()
-templates = Jinja2Templates(directory="src/templates")
 
 @router.get("/create", response_class=HTMLResponse)
 async def create_return_page(
@@ -33,13 +34,13 @@ async def create_return_page(
     result_orders = await session.execute(stmt_orders)
     orders = result_orders.scalars().all()
 
-    # Загружаем сотрудников для назначения штрафов
-    stmt_users = select(User).where(
+    # Загружаем сотрудников для назначения штрафов (только поля для чекбоксов)
+    stmt_users = select(User.id, User.name, User.role).where(
         User.is_active == True,
         User.role == UserRole.EMPLOYEE
     ).order_by(User.name)
     result_users = await session.execute(stmt_users)
-    employees = result_users.scalars().all()
+    employees = result_users.all()
 
     return templates.TemplateResponse("tiktok/returns/create.html", {
         "request": request,
@@ -92,27 +93,32 @@ async def create_return(
     )
     await session.execute(stmt)
     await session.commit()
+    await bump_reports_version()
     return RedirectResponse("/dashboard", status_code=302)
 
 @router.get("/all/list", response_class=HTMLResponse)
 async def list_returns_all(
     request: Request,
-    day: Optional[int] = Query(date.today().day),
-    month: Optional[int] = Query(date.today().month),
-    year: Optional[int] = Query(date.today().year),
+    day: Optional[int] = Query(None),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     sort_by: str = Query("date_desc"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user)
 ):
+    today = date.today()
+    day = day or today.day
+    month = month or today.month
+    year = year or today.year
+
     filters = [
-        extract("day", Return.date) == day,
-        extract("month", Return.date) == month,
-        extract("year", Return.date) == year
+        day_filter(Return.date, year, month, day),
     ]
 
+    # Заказ списку не нужен (достаточно order_id) - не подтягиваем его с типами
     stmt = select(Return).where(and_(*filters)).options(
-        joinedload(Return.created_by_user),
-        joinedload(Return.order)
+        selectinload(Return.created_by_user),
+        raiseload(Return.order)
     )
 
     # Применяем сортировку
@@ -137,9 +143,11 @@ async def list_returns_all(
 
     result = await session.execute(stmt)
     returns = result.scalars().all()
+    csrf_token = await generate_csrf_token(user.id)
 
     return templates.TemplateResponse("tiktok/returns/list.html", {
         "request": request,
+        "csrf_token": csrf_token,
         "returns": returns,
         "user": user,
         "day": day,
@@ -152,23 +160,27 @@ async def list_returns_all(
 async def list_returns_user(
     user_id: int,
     request: Request,
-    day: Optional[int] = Query(date.today().day),
-    month: Optional[int] = Query(date.today().month),
-    year: Optional[int] = Query(date.today().year),
+    day: Optional[int] = Query(None),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     sort_by: str = Query("date_desc"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_manager_or_admin)
 ):
+    today = date.today()
+    day = day or today.day
+    month = month or today.month
+    year = year or today.year
+
     filters = [
         Return.created_by == user.id,
-        extract("day", Return.date) == day,
-        extract("month", Return.date) == month,
-        extract("year", Return.date) == year
+        day_filter(Return.date, year, month, day),
     ]
 
+    # Заказ списку не нужен (достаточно order_id) - не подтягиваем его с типами
     stmt = select(Return).where(and_(*filters)).options(
-        joinedload(Return.created_by_user),
-        joinedload(Return.order)
+        selectinload(Return.created_by_user),
+        raiseload(Return.order)
     )
 
     # Применяем сортировку
@@ -193,9 +205,11 @@ async def list_returns_user(
 
     result = await session.execute(stmt)
     returns = result.scalars().all()
+    csrf_token = await generate_csrf_token(user.id)
 
     return templates.TemplateResponse("tiktok/returns/list.html", {
         "request": request,
+        "csrf_token": csrf_token,
         "returns": returns,
         "user": user,
         "day": day,
@@ -224,13 +238,13 @@ async def edit_return_page(
     result_orders = await session.execute(stmt_orders)
     orders = result_orders.scalars().all()
 
-    # Загружаем сотрудников для назначения штрафов
-    stmt_users = select(User).where(
+    # Загружаем сотрудников для назначения штрафов (только поля для чекбоксов)
+    stmt_users = select(User.id, User.name, User.role).where(
         User.is_active == True,
         User.role == UserRole.EMPLOYEE
     ).order_by(User.name)
     result_users = await session.execute(stmt_users)
-    employees = result_users.scalars().all()
+    employees = result_users.all()
 
     # Извлекаем список ID сотрудников с штрафами из penalty_distribution
     penalized_employee_ids = []
@@ -291,6 +305,7 @@ async def update_return(
     ret.penalty_amount = penalty_amount
     ret.penalty_distribution = penalty_distribution
     await session.commit()
+    await bump_reports_version()
 
     if user.role == "admin":
         return RedirectResponse("/returns/all/list", status_code=302)
@@ -300,6 +315,27 @@ async def update_return(
 async def delete_return(return_id: int, session: AsyncSession = Depends(get_async_session), user: User = Depends(get_admin_user)):
     await session.execute(delete(Return).where(Return.id == return_id))
     await session.commit()
+    await bump_reports_version()
     if user.role == "admin":
         return RedirectResponse("/returns/all/list", status_code=302)
     return RedirectResponse(f"/returns/{user.id}/list", status_code=302)
+
+@router.post("/bulk_delete", response_class=RedirectResponse)
+async def bulk_delete_returns(
+    ids: List[int] = Form([]),
+    csrf_token: str = Form(...),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_admin_user)
+):
+    if not csrf_token or not await verify_csrf_token(user.id, csrf_token):
+        raise HTTPException(status_code=403, detail="Invalid CSRF token")
+
+    # Ничего не отмечено - просто возвращаемся к списку
+    if not ids:
+        return RedirectResponse("/returns/all/list", status_code=302)
+
+    # Все выбранные возвраты удаляются одним DELETE ... WHERE id IN (...)
+    await session.execute(delete(Return).where(Return.id.in_(ids)))
+    await session.commit()
+    await bump_reports_version()
+    return RedirectResponse("/returns/all/list", status_code=302)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, Enum, ForeignKey, text, Time, Numeric
+from sqlalchemy import Column, Index, Integer, Date, Enum, ForeignKey, text, Time, Numeric
 from sqlalchemy.orm import relationship
 from src.database import Base, metadata
 from src.users.models import UserRole
@@ -25,6 +25,10 @@ class Shift(Base):
 
 class ShiftAssignment(Base):
     __tablename__ = "shift_assignments"
+    __table_args__ = (
+        Index("ix_shift_assignments_shift_id", "shift_id"),
+        Index("ix_shift_assignments_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     shift_id = Column(ForeignKey("shifts.id"), nullable=False)
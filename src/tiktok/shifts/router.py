@@ -2,21 +2,34 @@ from decimal import ROUND_HALF_UP, Decimal
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.params import Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-from sqlalchemy import and_, extract, select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import and_, delete, select, insert
 from datetime import date, datetime, time
 from typing import List, Optional
 
 from src.database import get_async_session
 from src.auth.dependencies import get_admin_user, get_manager_or_admin
 from src.users.models import User, UserRole
+from src.users.service import get_active_employees
 from src.tiktok.shifts.models import Shift, ShiftAssignment, ShiftLocation
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
+from src.utils.query_params import month_filter
+from src.tiktok.reports.cache import bump_reports_version
 
 router = APIRouter(tags=["Shifts"])
-templates = Jinja2Templates(directory="src/templates")
+
+
+async def _load_shift_users(session: AsyncSession, user_ids: List[int]) -> dict:
+    """Ставка и время смены по умолчанию для выбранных сотрудников одним запросом"""
+    result = await session.execute(
+        select(User.id, User.default_rate, User.shift_start, User.shift_end)
+        .where(User.id.in_(user_ids))
+    )
+    return {row.id: row for row in result}
+
 
 # 🧾 Страница создания смены
 @router.get("/create", response_class=HTMLResponse)
@@ -28,10 +41,7 @@ async def create_shift_page(
 ):
     csrf_token = await generate_csrf_token(user.id)
 
-    result = await session.execute(
-        select(User).where(User.is_active == True, User.role == UserRole.EMPLOYEE)
-    )
-    users = result.scalars().all()
+    users = await get_active_employees(session)
     return templates.TemplateResponse(
         "tiktok/shifts/create.html", 
         {
@@ -66,26 +76,31 @@ async def create_shift(
     if location == ShiftLocation.tiktok and len(employees) > 2:
         raise HTTPException(status_code=400, detail="В TikTok смене максимум 2 сотрудника")
 
-    stmt = select(Shift).where(Shift.date == date_, Shift.location == location)
-    result = await session.execute(stmt)
-    if result.scalar():
-        raise HTTPException(status_code=400, detail="Смена на эту дату и локацию уже существует")
+    users_by_id = await _load_shift_users(session, employees)
+    if len(users_by_id) != len(set(employees)):
+        raise HTTPException(status_code=400, detail="Выбран несуществующий сотрудник")
 
-    # 🏗️ Создаём саму смену
+    # 🏗️ Создаём саму смену. Дубликат ловит уникальный индекс shifts.date,
+    # поэтому отдельный SELECT на существование не нужен
     shift = Shift(date=date_, location=location, created_by=current_user.id)
     session.add(shift)
-    await session.flush()  # получаем shift.id
+    try:
+        await session.flush()  # получаем shift.id
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Смена на эту дату уже существует")
 
     form = await request.form()
 
-    # 🧩 Добавляем назначенных сотрудников
+    # 🧩 Добавляем назначенных сотрудников (одним multi-row INSERT)
+    rows = []
     for uid in employees:
         start_time_str = form.get(f"start_time_{uid}", "10:00")
         end_time_str = form.get(f"end_time_{uid}", "20:00")
         start_time_obj = time.fromisoformat(start_time_str)
         end_time_obj = time.fromisoformat(end_time_str)
 
-        user_obj = await session.get(User, uid)
+        user_obj = users_by_id[uid]
         def_hours = (datetime.combine(date.today(), user_obj.shift_end) -
                      datetime.combine(date.today(), user_obj.shift_start)).total_seconds() / 3600
         work_hours = (datetime.combine(date.today(), end_time_obj) -
@@ -93,34 +108,42 @@ async def create_shift(
         salary = (Decimal(user_obj.default_rate) *
                   Decimal(work_hours) / Decimal(def_hours)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
 
-        assignment = ShiftAssignment(
-            shift_id=shift.id,
-            user_id=uid,
-            created_by=current_user.id,
-            start_time=start_time_obj,
-            end_time=end_time_obj,
-            salary=salary
-        )
-        session.add(assignment)
-
+        rows.append({
+            "shift_id": shift.id,
+            "user_id": uid,
+            "created_by": current_user.id,
+            "start_time": start_time_obj,
+            "end_time": end_time_obj,
+            "salary": salary,
+        })
+
+    if rows:
+        await session.execute(insert(ShiftAssignment), rows)
     await session.commit()
+    await bump_reports_version()
     return RedirectResponse("/dashboard", status_code=302)
 
 @router.get("/list", response_class=HTMLResponse)
 async def shift_list_page(
     request: Request,
-    month: Optional[int] = Query(datetime.today().month),
-    year: Optional[int] = Query(datetime.today().year),
+    month: Optional[int] = Query(None),
+    year: Optional[int] = Query(None),
     sort_by: str = Query(default="desc"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_manager_or_admin),
 ):
-    filters = [extract("month", Shift.date) == month, extract("year", Shift.date) == year]
+    today = date.today()
+    month = month or today.month
+    year = year or today.year
 
+    filters = [month_filter(Shift.date, year, month)]
+
+    # Коллекцию назначений грузим selectinload: joinedload размножал строки смены
+    # на каждое назначение и требовал .unique() на стороне Python
     stmt = (select(Shift)
     .where(and_(*filters))
     .options(
-        joinedload(Shift.assignments).joinedload(ShiftAssignment.user),
+        selectinload(Shift.assignments).joinedload(ShiftAssignment.user),
         joinedload(Shift.created_by_user)
     ))
 
@@ -130,7 +153,7 @@ async def shift_list_page(
         stmt = stmt.order_by(Shift.date)
 
     result = await session.execute(stmt)
-    shifts = result.scalars().unique().all()
+    shifts = result.scalars().all()
 
     return templates.TemplateResponse("tiktok/shifts/list.html", {
         "request": request,
@@ -157,10 +180,7 @@ async def edit_shift_page(
     if not shift:
         raise HTTPException(status_code=404, detail="Смена не найдена")
 
-    result = await session.execute(
-        select(User).where(User.is_active == True, User.role == UserRole.EMPLOYEE)
-    )
-    users = result.scalars().all()
+    users = await get_active_employees(session)
 
     assigned_ids = [a.user_id for a in shift.assignments]
 
@@ -190,30 +210,34 @@ async def update_shift(
     if not csrf_token or not await verify_csrf_token(current_user.id, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token")
 
-    shift = await session.get(Shift, shift_id, options=[joinedload(Shift.assignments)])
+    shift = await session.get(Shift, shift_id)
     if not shift:
         raise HTTPException(status_code=404, detail="Смена не найдена")
 
     if location == ShiftLocation.tiktok and len(employees) > 2:
         raise HTTPException(status_code=400, detail="В TikTok максимум 2 сотрудника")
 
+    users_by_id = await _load_shift_users(session, employees)
+    if len(users_by_id) != len(set(employees)):
+        raise HTTPException(status_code=400, detail="Выбран несуществующий сотрудник")
+
     shift.date = date_
     shift.location = location
 
     form = await request.form()
 
-    # Удаляем старые назначения
-    for assignment in shift.assignments:
-        await session.delete(assignment)
+    # Удаляем старые назначения одним запросом
+    await session.execute(delete(ShiftAssignment).where(ShiftAssignment.shift_id == shift.id))
 
-    # Добавляем новые назначения
+    # Добавляем новые назначения (одним multi-row INSERT)
+    rows = []
     for uid in employees:
         start_time_str = form.get(f"start_time_{uid}", "10:00")
         end_time_str = form.get(f"end_time_{uid}", "20:00")
         start_time_obj = time.fromisoformat(start_time_str)
         end_time_obj = time.fromisoformat(end_time_str)
 
-        user_obj = await session.get(User, uid)
+        user_obj = users_by_id[uid]
         def_hours = (datetime.combine(date.today(), user_obj.shift_end) -
                      datetime.combine(date.today(), user_obj.shift_start)).total_seconds() / 3600
         work_hours = (datetime.combine(date.today(), end_time_obj) -
@@ -221,16 +245,19 @@ async def update_shift(
         salary = (Decimal(user_obj.default_rate) *
                   Decimal(work_hours) / Decimal(def_hours)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
 
-        session.add(ShiftAssignment(
-            shift_id=shift.id,
-            user_id=uid,
-            created_by=current_user.id,
-            start_time=start_time_obj,
-            end_time=end_time_obj,
-            salary=salary
-        ))
-
+        rows.append({
+            "shift_id": shift.id,
+            "user_id": uid,
+            "created_by": current_user.id,
+            "start_time": start_time_obj,
+            "end_time": end_time_obj,
+            "salary": salary,
+        })
+
+    if rows:
+        await session.execute(insert(ShiftAssignment), rows)
     await session.commit()
+    await bump_reports_version()
     redirect_to = return_url or "/shifts/list"
     return RedirectResponse(redirect_to, status_code=302)
 
@@ -240,8 +267,7 @@ async def delete_shift(
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_admin_user)
 ):
-    # Получаем смену и связанные назначения
-    shift = await session.get(Shift, shift_id, options=[joinedload(Shift.assignments)])
+    shift = await session.get(Shift, shift_id)
     if not shift:
         raise HTTPException(status_code=404, detail="Смена не найдена")
 
@@ -249,13 +275,11 @@ async def delete_shift(
     if user.role == UserRole.MANAGER and shift.created_by != user.id:
         raise HTTPException(status_code=403, detail="Недостаточно прав для удаления этой смены")
 
-    # Удаляем назначения
-    for assignment in shift.assignments:
-        await session.delete(assignment)
-
-    # Удаляем саму смену
-    await session.delete(shift)
+    # Назначения и саму смену удаляем двумя DELETE без загрузки назначений в сессию
+    await session.execute(delete(ShiftAssignment).where(ShiftAssignment.shift_id == shift_id))
+    await session.execute(delete(Shift).where(Shift.id == shift_id))
     await session.commit()
+    await bump_reports_version()
 
     return RedirectResponse("/shifts/list", status_code=302)
 
@@ -265,17 +289,16 @@ async def get_shift_employees(
     session: AsyncSession = Depends(get_async_session),
     _: User = Depends(get_manager_or_admin),
 ):
+    # Нужны только имена: выбираем одну колонку вместо полных Shift/User
     stmt = (
-        select(Shift)
+        select(User.name)
+        .join(ShiftAssignment, ShiftAssignment.user_id == User.id)
+        .join(Shift, Shift.id == ShiftAssignment.shift_id)
         .where(Shift.date == date)
-        .options(joinedload(Shift.assignments).joinedload(ShiftAssignment.user))
+        .order_by(ShiftAssignment.id)
     )
     result = await session.execute(stmt)
-    shift = result.unique().scalar_one_or_none()
-
-    if not shift:
-        return {"employees": []}
 
     return {
-        "employees": [a.user.name for a in shift.assignments]
+        "employees": result.scalars().all()
     }
@@ -1,7 +1,7 @@
 from datetime import datetime, time
 from enum import Enum
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum as SqlEnum, Numeric, Time
+from sqlalchemy import Column, Index, Integer, String, DateTime, Boolean, Enum as SqlEnum, Numeric, Time
 from sqlalchemy.orm import relationship
 from src.database import Base, metadata
 
@@ -17,9 +17,18 @@ class UserRole(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    # Покрывающий индекс: логин читает всё нужное прямо из индекса
+    __table_args__ = (
+        Index(
+            "ix_users_email",
+            "email",
+            unique=True,
+            postgresql_include=["id", "hashed_password", "is_active", "role"],
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, nullable=False, index=True)
+    email = Column(String, nullable=False)
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(SqlEnum(UserRole), nullable=False, default=UserRole.EMPLOYEE)
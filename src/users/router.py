@@ -2,29 +2,28 @@ from datetime import time, date, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, status, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, extract
-from passlib.context import CryptContext
 from decimal import Decimal
 from collections import defaultdict
 
-from src.auth.dependencies import get_admin_user, get_current_user
+from src.auth.dependencies import get_admin_user, get_current_user, invalidate_user_cache
+from src.auth.passwords import pwd_context
 from src.users import schemas
 from src.users.models import User, UserRole
+from src.users.service import invalidate_active_employees, invalidate_user_map
 from src.database import get_async_session
 from sqlalchemy.future import select
 from src.tiktok.returns.models import Return
 from src.tiktok.shifts.models import Shift, ShiftAssignment
 
 from src.utils.csrf import generate_csrf_token, verify_csrf_token
+from src.templates_env import templates
+from src.tiktok.reports.cache import bump_reports_version
 
 router = APIRouter(tags=["Users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-templates = Jinja2Templates(directory="src/templates")
 
 @router.get("/create", response_class=HTMLResponse)
 async def user_create_page(request: Request, admin: User = Depends(get_admin_user)):
@@ -71,6 +70,9 @@ async def user_create_form(
     )
     session.add(new_user)
     await session.commit()
+    await bump_reports_version()
+    await invalidate_user_map()
+    await invalidate_active_employees()
     return RedirectResponse("/users/me", status_code=302)
 
 @router.get("/me", response_class=HTMLResponse)
@@ -241,6 +243,10 @@ async def update_user(
     user.shift_start = time.fromisoformat(shift_start)
     user.shift_end = time.fromisoformat(shift_end)
     await session.commit()
+    await bump_reports_version()
+    await invalidate_user_cache(user_id)
+    await invalidate_user_map()
+    await invalidate_active_employees()
     return RedirectResponse("/users/me", status_code=302)
 
 @router.post("/{user_id}/delete", response_class=RedirectResponse)
@@ -255,6 +261,10 @@ async def delete_user(
     try:
         await session.delete(user)
         await session.commit()
+        await bump_reports_version()
+        await invalidate_user_cache(user_id)
+        await invalidate_user_map()
+        await invalidate_active_employees()
         return RedirectResponse("/users/me", status_code=302)
     except IntegrityError:
         await session.rollback()
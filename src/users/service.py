@@ -0,0 +1,58 @@
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import redis_client
+from src.users.models import User, UserRole
+
+USER_MAP_CACHE_KEY = "user_map:v1"
+USER_MAP_CACHE_TTL = 300  # 5 минут
+
+ACTIVE_EMPLOYEES_CACHE_KEY = "active_employees:v1"
+ACTIVE_EMPLOYEES_CACHE_TTL = 60
+
+
+async def get_user_map(session: AsyncSession) -> dict[int, str]:
+    """Словарь {id: имя} всех пользователей; имена меняются редко, держим в Redis"""
+    cached = await redis_client.get(USER_MAP_CACHE_KEY)
+    if cached is not None:
+        # JSON хранит ключи строками
+        return {int(uid): name for uid, name in json.loads(cached).items()}
+
+    result = await session.execute(select(User.id, User.name))
+    user_map = dict(result.all())
+    await redis_client.set(USER_MAP_CACHE_KEY, json.dumps(user_map), ex=USER_MAP_CACHE_TTL)
+    return user_map
+
+
+async def invalidate_user_map():
+    await redis_client.delete(USER_MAP_CACHE_KEY)
+
+
+async def get_active_employees(session: AsyncSession) -> list[dict]:
+    """Активные сотрудники для выбора в сменах: id, имя, ставка и время смены по умолчанию"""
+    cached = await redis_client.get(ACTIVE_EMPLOYEES_CACHE_KEY)
+    if cached is not None:
+        return json.loads(cached)
+
+    result = await session.execute(
+        select(User.id, User.name, User.default_rate, User.shift_start, User.shift_end)
+        .where(User.is_active == True, User.role == UserRole.EMPLOYEE)
+    )
+    employees = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "default_rate": str(row.default_rate),
+            "shift_start": row.shift_start.strftime("%H:%M"),
+            "shift_end": row.shift_end.strftime("%H:%M"),
+        }
+        for row in result
+    ]
+    await redis_client.set(ACTIVE_EMPLOYEES_CACHE_KEY, json.dumps(employees), ex=ACTIVE_EMPLOYEES_CACHE_TTL)
+    return employees
+
+
+async def invalidate_active_employees():
+    await redis_client.delete(ACTIVE_EMPLOYEES_CACHE_KEY)
@@ -1,11 +1,11 @@
 from celery import Celery
 from celery.schedules import crontab
-from src.config import CELERY_BACHUP_RATE, REDIS_HOST, REDIS_PORT
+from src.config import settings
 
 celery_app = Celery(
     "tasks",
-    broker=f"redis://{REDIS_HOST}:{REDIS_PORT}/0",
-    backend=f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    broker=f"redis://{settings.redis_host}:{settings.redis_port}/0",
+    backend=f"redis://{settings.redis_host}:{settings.redis_port}/1",
     include=["src.tasks.backup", "src.tasks.cleanup", "src.tasks.reporting", "src.tasks.notifications"]
 )
 
@@ -1,12 +1,10 @@
 from src.database import async_session_maker
-from passlib.context import CryptContext
+from src.auth.passwords import pwd_context
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from src.users.models import User, UserRole
 
 async def create_user(email, name, role, password, default_rate=1000.0, default_percent=0.0):
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
     async with async_session_maker() as session:
         result = await session.execute(select(User).where(User.email == email))
         existing = result.scalar_one_or_none()
@@ -1,18 +1,31 @@
-import secrets
-import redis.asyncio as redis
-from src.config import REDIS_HOST, REDIS_PORT, CSRF_TOKEN_EXPIRY
+import hashlib
+import hmac
+import time
+from src.config import settings
+
+# Отдельный ключ для CSRF, выведенный из общего секрета, чтобы подпись
+# нельзя было переиспользовать в другом контексте (JWT и т.п.)
+_CSRF_KEY = hmac.new(settings.secret.encode(), b"csrf", hashlib.sha256).digest()
+
+
+def _sign(user_id: int, issued_at: int) -> str:
+    msg = f"{user_id}.{issued_at}".encode()
+    return hmac.new(_CSRF_KEY, msg, hashlib.sha256).hexdigest()
 
-r = redis.Redis(host=REDIS_HOST, port=int(REDIS_PORT), decode_responses=True)
 
 async def generate_csrf_token(user_id: int) -> str:
-    token = secrets.token_hex(32)
-    await r.setex(f"csrf:{user_id}:{token}", CSRF_TOKEN_EXPIRY, "valid")
-    return token
+    # Токен вида "<issued_at>.<подпись>": проверяется без обращения к Redis.
+    # Одноразовым он не является - его можно повторно использовать до истечения
+    # csrf_token_expiry; от CSRF защищает привязка к пользователю и подпись
+    issued_at = int(time.time())
+    return f"{issued_at}.{_sign(user_id, issued_at)}"
 
 async def verify_csrf_token(user_id: int, token: str) -> bool:
-    key = f"csrf:{user_id}:{token}"
-    print(f"Verifying CSRF token: {key}")
-    exists = await r.exists(key)
-    if exists:
-        await r.delete(key)
-    return bool(exists)
+    issued_part, _, signature = token.partition(".")
+    # isdigit() пропускает не-ASCII цифры (например "²"), на которых int() падает
+    if not (issued_part.isascii() and issued_part.isdigit()) or not signature:
+        return False
+    issued_at = int(issued_part)
+    if time.time() - issued_at > settings.csrf_token_expiry:
+        return False
+    return hmac.compare_digest(_sign(user_id, issued_at), signature)
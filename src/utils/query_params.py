@@ -3,6 +3,8 @@
 from datetime import date
 from typing import Optional
 
+from sqlalchemy import and_, false
+
 
 def optional_date(value: Optional[str] = None) -> Optional[date]:
     """
@@ -29,3 +31,32 @@ def optional_date(value: Optional[str] = None) -> Optional[date]:
 
     # Parse the string as a date
     return date.fromisoformat(value)
+
+
+def day_filter(column, year: int, month: int, day: int):
+    """
+    Build an ``column == date(year, month, day)`` filter from separate query parameters.
+
+    A single equality keeps the condition index-friendly, unlike three
+    ``extract(...)`` comparisons. The filter form lets the day (1-31) be chosen
+    independently of the month, so an impossible date (e.g. 31 April) yields
+    an always-false condition, i.e. an empty list, as the ``extract`` version did.
+    """
+    try:
+        return column == date(year, month, day)
+    except (ValueError, OverflowError):
+        return false()
+
+
+def month_filter(column, year: int, month: int):
+    """
+    Build a half-open ``[first_day, first_day_of_next_month)`` range filter.
+
+    An impossible month yields an always-false condition, like ``day_filter``.
+    """
+    try:
+        first = date(year, month, 1)
+        next_first = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    except (ValueError, OverflowError):
+        return false()
+    return and_(column >= first, column < next_first)
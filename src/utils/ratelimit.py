@@ -1,8 +1,4 @@
-import redis.asyncio as redis
-
-from src.config import REDIS_HOST, REDIS_PORT
-
-redis_client = redis.Redis(host=REDIS_HOST, port=int(REDIS_PORT), decode_responses=True)
+from src.cache import redis_client
 
 # Настройки
 MAX_ATTEMPTS = 5
@@ -0,0 +1,21 @@
+import re
+
+from fastapi.staticfiles import StaticFiles
+
+# Файлы с хешем содержимого в имени (app.3f9a1c2e.css) никогда не меняются
+FINGERPRINTED = re.compile(r".*\.[0-9a-f]{8,}\.(js|css|png|jpg|jpeg|svg|webp|woff2?)$")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+DEFAULT_CACHE = "public, max-age=300"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles с заголовком Cache-Control; ETag/Last-Modified ставит сам FileResponse"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if FINGERPRINTED.match(scope["path"]):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        else:
+            response.headers["Cache-Control"] = DEFAULT_CACHE
+        return response